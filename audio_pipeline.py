@@ -0,0 +1,123 @@
+import bisect
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Dict, Optional
+import config
+import metrics
+
+BYTES_PER_SAMPLE = 2  # 16-bit PCM
+# A failing transcriber fails every chunk (10 per second at 100 ms); log at most this often
+ERROR_LOG_INTERVAL = 10.0
+
+class AudioPipeline:
+    """Bounded per-session audio buffer drained by a dedicated sender thread.
+
+    The WebSocket loop only appends bytes (never blocks on the transcriber); the
+    sender thread coalesces them into fixed-size chunks and calls ``sink`` with
+    each one. When the transcriber falls behind and more than ``max_buffered_ms``
+    is waiting, the oldest audio is dropped so latency stays bounded.
+    """
+
+    def __init__(
+        self,
+        sink: Callable[[bytes], None],
+        sample_rate: int = 16000,
+        chunk_ms: int = config.audio_chunk_ms,
+        max_buffered_ms: int = config.audio_max_buffered_ms,
+        name: str = "audio-sender",
+    ):
+        self.sink = sink
+        self.bytes_per_ms = sample_rate * BYTES_PER_SAMPLE // 1000
+        self.chunk_bytes = chunk_ms * self.bytes_per_ms
+        self.max_bytes = max(max_buffered_ms * self.bytes_per_ms, self.chunk_bytes)
+        self._buffer = bytearray()
+        self._cond = threading.Condition()
+        self._closed = False
+
+        # Metrics
+        self.frames_in = 0
+        self.chunks_out = 0
+        self.bytes_dropped = 0
+        self.max_depth_bytes = 0
+        self.send_errors = 0
+        self.send_seconds = 0.0
+        self._error_logged_at: Optional[float] = None
+
+        # (transcriber audio offset in ms after the chunk, monotonic time it was sent);
+        # lets transcript timestamps be mapped back to when their audio went out
+        self._sent_timeline = deque(maxlen=600)
+        self._sent_ms = 0
+
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def push(self, data: bytes) -> None:
+        """Queue a frame from the client. Never blocks on the transcriber."""
+        with self._cond:
+            if self._closed:
+                return
+            self.frames_in += 1
+            self._buffer += data
+            overflow = len(self._buffer) - self.max_bytes
+            if overflow > 0:
+                # Drop the oldest audio, keeping sample alignment
+                overflow += overflow % BYTES_PER_SAMPLE
+                del self._buffer[:overflow]
+                self.bytes_dropped += overflow
+            self.max_depth_bytes = max(self.max_depth_bytes, len(self._buffer))
+            if len(self._buffer) >= self.chunk_bytes:
+                self._cond.notify()
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while len(self._buffer) < self.chunk_bytes and not self._closed:
+                    self._cond.wait()
+                if self._closed and not self._buffer:
+                    return
+                size = self.chunk_bytes if len(self._buffer) >= self.chunk_bytes else len(self._buffer)
+                chunk = bytes(self._buffer[:size])
+                del self._buffer[:size]
+
+            started = time.perf_counter()
+            try:
+                self.sink(chunk)
+                self.chunks_out += 1
+                self._sent_ms += len(chunk) // self.bytes_per_ms
+                self._sent_timeline.append((self._sent_ms, time.monotonic()))
+            except Exception as e:
+                self.send_errors += 1
+                now = time.monotonic()
+                if self._error_logged_at is None or now - self._error_logged_at >= ERROR_LOG_INTERVAL:
+                    self._error_logged_at = now
+                    metrics.logger.warning("Error streaming audio chunk (%d failed so far): %s", self.send_errors, e)
+            self.send_seconds += time.perf_counter() - started
+
+    def close(self, timeout: float = 2.0) -> None:
+        """Flush remaining audio and stop the sender thread."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        self._thread.join(timeout)
+
+    def sent_at(self, audio_ms: int) -> Optional[float]:
+        """Monotonic time at which the audio at ``audio_ms`` was handed to the transcriber."""
+        timeline = list(self._sent_timeline)
+        index = bisect.bisect_left(timeline, (audio_ms, 0.0))
+        if index >= len(timeline):
+            return None
+        return timeline[index][1]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            depth = len(self._buffer)
+        return {
+            "queue_depth_ms": depth // self.bytes_per_ms,
+            "max_queue_depth_ms": self.max_depth_bytes // self.bytes_per_ms,
+            "frames_in": self.frames_in,
+            "chunks_out": self.chunks_out,
+            "dropped_ms": self.bytes_dropped // self.bytes_per_ms,
+            "send_errors": self.send_errors,
+            "avg_send_ms": (self.send_seconds / self.chunks_out * 1000) if self.chunks_out else 0.0,
+        }
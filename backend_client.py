@@ -0,0 +1,107 @@
+import asyncio
+from typing import Any, Dict, Optional
+import httpx
+import config
+
+# Methods that are safe to retry after a transport error or 5xx response
+IDEMPOTENT_METHODS = {"GET", "HEAD", "PUT", "DELETE", "OPTIONS"}
+RETRY_STATUS_CODES = {502, 503, 504}
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+class BackendClient:
+    """Process-wide pooled HTTP client for the task backend."""
+
+    def __init__(
+        self,
+        base_url: str = config.backend_base_url,
+        max_connections: int = config.backend_max_connections,
+        max_keepalive: int = config.backend_max_keepalive,
+        keepalive_expiry: float = config.backend_keepalive_expiry,
+        connect_timeout: float = config.backend_connect_timeout,
+        timeout: float = config.backend_timeout,
+        max_retries: int = config.backend_max_retries,
+        retry_backoff: float = config.backend_retry_backoff,
+    ):
+        self.base_url = base_url
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self.timeout = httpx.Timeout(timeout, connect=connect_timeout)
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self._client: Optional[httpx.AsyncClient] = None
+
+    def _open(self) -> httpx.AsyncClient:
+        return httpx.AsyncClient(
+            base_url=self.base_url,
+            limits=self.limits,
+            timeout=self.timeout,
+            http2=_http2_available(),
+            headers={"Content-Type": "application/json"},
+        )
+
+    async def start(self) -> None:
+        """Open the connection pool (called once at application startup)."""
+        if self._client is None or self._client.is_closed:
+            self._client = self._open()
+
+    async def close(self) -> None:
+        """Close the connection pool (called at application shutdown)."""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        # Lazily open the pool when used outside the FastAPI lifecycle (scripts, REPL)
+        if self._client is None or self._client.is_closed:
+            self._client = self._open()
+        return self._client
+
+    async def request(
+        self,
+        method: str,
+        path: str,
+        auth_token: Optional[str] = None,
+        json: Optional[Dict[str, Any]] = None,
+        max_retries: Optional[int] = None,
+    ) -> httpx.Response:
+        """Send a request over the shared pool, retrying idempotent calls with backoff.
+
+        ``max_retries`` overrides the client default, e.g. 0 for callers with their own retry loop.
+        """
+        method = method.upper()
+        headers = {"Authorization": f"Bearer {auth_token}"} if auth_token else None
+        retries = (self.max_retries if max_retries is None else max_retries) if method in IDEMPOTENT_METHODS else 0
+
+        attempt = 0
+        while True:
+            try:
+                response = await self.client.request(method, path, json=json, headers=headers)
+                if response.status_code not in RETRY_STATUS_CODES or attempt >= retries:
+                    return response
+            except httpx.RequestError:
+                if attempt >= retries:
+                    raise
+            await asyncio.sleep(self.retry_backoff * (2 ** attempt))
+            attempt += 1
+
+    async def get(self, path: str, auth_token: Optional[str] = None) -> httpx.Response:
+        return await self.request("GET", path, auth_token)
+
+    async def post(self, path: str, auth_token: Optional[str] = None, json: Optional[Dict[str, Any]] = None) -> httpx.Response:
+        return await self.request("POST", path, auth_token, json)
+
+    async def put(self, path: str, auth_token: Optional[str] = None, json: Optional[Dict[str, Any]] = None) -> httpx.Response:
+        return await self.request("PUT", path, auth_token, json)
+
+# Shared instance used by the task-manager tools
+backend_client = BackendClient()
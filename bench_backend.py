@@ -0,0 +1,98 @@
+"""Task backend client benchmark: the pooled BackendClient vs a new httpx client per call.
+
+Starts the mock task backend from loadtest.py on a local port and sends the
+same POST /todo/tasks/ requests both ways, the way the tools used to
+(``async with httpx.AsyncClient()`` per call) and through the shared pool:
+
+    python bench_backend.py --requests 2000 --concurrency 50
+
+Reports requests/sec and p50/p95/p99 latency. The stand-in is plain HTTP on
+loopback, so this measures connection setup and client construction only;
+against the real backend each new connection also pays DNS and a TLS handshake.
+"""
+import argparse
+import asyncio
+import os
+import time
+from typing import Any, Awaitable, Callable, Dict, List
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000, help="requests per mode")
+    parser.add_argument("--concurrency", type=int, default=50, help="requests in flight at once")
+    parser.add_argument("--backend-latency", type=float, default=0.0, help="mock task backend latency (s)")
+    parser.add_argument("--backend-port", type=int, default=8767)
+    return parser.parse_args()
+
+async def run_mode(send: Callable[[], Awaitable[Any]], requests: int, concurrency: int) -> Dict[str, float]:
+    from loadtest import percentile
+
+    latencies: List[float] = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with semaphore:
+            started = time.perf_counter()
+            response = await send()
+            response.raise_for_status()
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(requests)))
+    elapsed = time.perf_counter() - started
+    return {
+        "req_per_sec": requests / elapsed,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+    }
+
+async def main_async(args) -> Dict[str, Dict[str, float]]:
+    import httpx
+    from backend_client import BackendClient
+    from loadtest import build_backend_app, serve
+
+    base_url = f"http://127.0.0.1:{args.backend_port}"
+    payload = {"content": "buy milk", "description": "", "priority": 1, "project_id": 1}
+    server, task = await serve(build_backend_app(args.backend_latency), args.backend_port)
+
+    async def per_call():
+        # What each tool call did before the shared pool
+        async with httpx.AsyncClient() as client:
+            return await client.post(f"{base_url}/todo/tasks/", json=payload,
+                                     headers={"Authorization": "Bearer bench", "Content-Type": "application/json"})
+
+    pooled_client = BackendClient(base_url=base_url)
+    await pooled_client.start()
+
+    async def pooled():
+        return await pooled_client.post("/todo/tasks/", "bench", json=payload)
+
+    try:
+        # Warm both paths (imports, the pool's first connections) before measuring
+        await run_mode(per_call, min(args.concurrency, args.requests), args.concurrency)
+        await run_mode(pooled, min(args.concurrency, args.requests), args.concurrency)
+        return {
+            "per-call": await run_mode(per_call, args.requests, args.concurrency),
+            "pooled": await run_mode(pooled, args.requests, args.concurrency),
+        }
+    finally:
+        await pooled_client.close()
+        server.should_exit = True
+        await task
+
+def main():
+    args = parse_args()
+    # config.py refuses to import without API keys; none are used here
+    os.environ.setdefault("OPENAI_API_KEY", "bench")
+    os.environ.setdefault("ASSEMBLYAI_API_KEY", "bench")
+
+    results = asyncio.run(main_async(args))
+    print(f"{'mode':>10} {'req/s':>10} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for mode, row in results.items():
+        print(f"{mode:>10} {row['req_per_sec']:>10.1f} {row['p50_ms']:>8.2f} {row['p95_ms']:>8.2f} {row['p99_ms']:>8.2f}")
+    print(f"\npooled speedup: {results['pooled']['req_per_sec'] / results['per-call']['req_per_sec']:.2f}x "
+          f"(requests={args.requests}, concurrency={args.concurrency})")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""Micro-benchmark of per-frame serialization cost for WebSocket frames and tool messages.
+
+Compares stdlib ``json`` with the serialization layer (orjson, pre-encoded
+constant frames and msgpack) on the frames a turn actually sends:
+
+    python bench_frames.py --tasks 200 --iterations 20000
+
+Reports microseconds of CPU per frame and encoded size in bytes.
+"""
+import argparse
+import json
+import time
+from typing import Any, Callable, Dict, List
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=20000, help="encodes per small frame")
+    parser.add_argument("--tasks", type=int, default=200, help="tasks in the get_current_tasks tool result")
+    return parser.parse_args()
+
+def per_call_us(fn: Callable[[], Any], iterations: int) -> float:
+    started = time.process_time()
+    for _ in range(iterations):
+        fn()
+    return (time.process_time() - started) / iterations * 1e6
+
+def main():
+    import ormsgpack
+    from serialization import JSON_CODEC, MSGPACK_CODEC, dumps_text
+
+    args = parse_args()
+    chunk = {"type": "chunk", "text": "You have three tasks due today, starting with the quarterly report."}
+    end = {"type": "end", "text": ""}
+    tool_result = {
+        "status": "success",
+        "tasks": [
+            {"id": i, "content": f"task number {i}", "description": "", "priority": i % 4 + 1,
+             "project_id": i % 5 + 1, "due_date": "2026-10-17", "reminder_at": None, "is_completed": False}
+            for i in range(args.tasks)
+        ],
+    }
+
+    cases: List[Dict[str, Any]] = [
+        {"frame": "chunk", "encoder": "json.dumps", "fn": lambda: json.dumps(chunk), "n": args.iterations},
+        {"frame": "chunk", "encoder": "orjson", "fn": lambda: JSON_CODEC.encode(chunk), "n": args.iterations},
+        {"frame": "chunk", "encoder": "msgpack", "fn": lambda: MSGPACK_CODEC.encode(chunk), "n": args.iterations},
+        {"frame": "end", "encoder": "json.dumps", "fn": lambda: json.dumps(end), "n": args.iterations},
+        {"frame": "end", "encoder": "pre-encoded", "fn": lambda: JSON_CODEC._end, "n": args.iterations},
+        {"frame": "tool_result", "encoder": "json.dumps", "fn": lambda: json.dumps(tool_result), "n": max(args.iterations // 100, 10)},
+        {"frame": "tool_result", "encoder": "orjson", "fn": lambda: dumps_text(tool_result), "n": max(args.iterations // 100, 10)},
+        {"frame": "tool_result", "encoder": "msgpack", "fn": lambda: ormsgpack.packb(tool_result), "n": max(args.iterations // 100, 10)},
+    ]
+
+    print(f"{'frame':>12} {'encoder':>12} {'us/frame':>10} {'bytes':>8}")
+    for case in cases:
+        encoded = case["fn"]()
+        size = len(encoded.encode() if isinstance(encoded, str) else encoded)
+        print(f"{case['frame']:>12} {case['encoder']:>12} {per_call_us(case['fn'], case['n']):>10.2f} {size:>8}")
+
+if __name__ == "__main__":
+    main()
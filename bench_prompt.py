@@ -0,0 +1,169 @@
+"""Prompt layout harness: prompt tokens per model call and how much of each prompt is a stable prefix.
+
+Replays a scripted conversation against a synthetic session without calling
+the model, building every prompt exactly as ``call_model`` would. For each
+call it reports prompt tokens, the time spent building the prompt, and the
+share of the prompt (tool schemas included) that is byte-identical to the
+previous call's, which is what provider-side prompt caching can reuse:
+
+    python bench_prompt.py --tasks 200 --turns 12
+    python bench_prompt.py --layout legacy   # context inlined in the system prompt, as before
+
+Several ``--tasks`` values sweep session size instead, one summary row each;
+``--layout unbounded`` is the original prompt with every task inlined:
+
+    python bench_prompt.py --tasks 10 100 1000 5000 --layout cached
+    python bench_prompt.py --tasks 10 100 1000 5000 --layout unbounded
+
+Model prefill time grows with prompt tokens, so the token columns are the
+latency to compare across layouts; build time is the server-side part.
+
+No API keys or network access are needed.
+"""
+import argparse
+import os
+import time
+import uuid
+from typing import Any, Dict, List
+
+SCRIPT = [
+    ("What should I focus on today?", None),
+    ("Add buy milk to my inbox", {"content": "buy milk", "project_id": 1}),
+    ("Anything due this week?", None),
+    ("Add call the dentist", {"content": "call the dentist", "project_id": 1}),
+    ("Which project has the most tasks?", None),
+    ("Remind me what I just added", None),
+]
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tasks", type=int, nargs="+", default=[50], help="tasks in the synthetic session (several values sweep)")
+    parser.add_argument("--projects", type=int, default=5, help="projects in the synthetic session")
+    parser.add_argument("--turns", type=int, default=12, help="turns to replay (the script repeats)")
+    parser.add_argument("--layout", choices=("cached", "legacy", "unbounded"), default="cached", help="prompt layout to measure")
+    return parser.parse_args()
+
+def token_counter():
+    try:
+        import tiktoken
+        encoding = tiktoken.get_encoding("cl100k_base")
+        return lambda text: len(encoding.encode(text))
+    except Exception:
+        return lambda text: (len(text) + 3) // 4
+
+def serialize(tool_schemas: List[Dict[str, Any]], messages) -> str:
+    """Approximation of the request body the provider tokenizes: tools first, then messages in order."""
+    from serialization import dumps_text
+    parts = [dumps_text(tool_schemas)]
+    for message in messages:
+        parts.append(f"<{message.type}>{message.content}")
+        if getattr(message, "tool_calls", None):
+            parts.append(dumps_text(message.tool_calls))
+    return "\n".join(parts)
+
+def common_prefix(a: str, b: str) -> int:
+    limit = min(len(a), len(b))
+    index = 0
+    while index < limit and a[index] == b[index]:
+        index += 1
+    return index
+
+def replay(args, task_count: int, count) -> List[tuple]:
+    """Replay the script against a session with ``task_count`` tasks; one row per model call."""
+    from langchain_core.messages import AIMessage, HumanMessage, SystemMessage, ToolMessage
+    from conversation_memory import ConversationMemory
+    from task_store import TaskStore
+    import transcript_processor as tp
+
+    session_id = "bench"
+    session = {
+        "auth_token": "bench",
+        "projects": [f"Project {i}" for i in range(args.projects)],
+        "tasks": TaskStore([
+            {"id": i, "content": f"task number {i}", "project_id": i % args.projects + 1, "due_date": "2026-10-17"}
+            for i in range(task_count)
+        ]),
+        "conversation": ConversationMemory(),
+    }
+    session_memory = {session_id: session}
+
+    def build(state) -> List[Any]:
+        if args.layout == "unbounded":
+            system = (tp.SYSTEM_INSTRUCTIONS + f"\nCurrent projects: {', '.join(session['projects'])}"
+                      f"\nCurrent tasks: {session['tasks'].prompt_summary()}\n")
+            return [SystemMessage(content=system), *state["messages"]]
+        if args.layout == "legacy":
+            project_text, task_text, _ = tp.build_context(session, state["transcript"])
+            system = tp.SYSTEM_INSTRUCTIONS + f"\nCurrent projects: {project_text}\nCurrent tasks: {task_text}\n"
+            if session["conversation"].summary:
+                system += f"\nEarlier in this conversation: {session['conversation'].summary}\n"
+            return [SystemMessage(content=system), *state["messages"]]
+        return tp.build_prompt(state)
+
+    def prompt_for(state) -> tuple:
+        started = time.perf_counter()
+        prompt = build(state)
+        return prompt, time.perf_counter() - started
+
+    previous = ""
+    rows = []
+    for turn in range(args.turns):
+        transcript, write = SCRIPT[turn % len(SCRIPT)]
+        messages = session["conversation"].messages
+        history_length = len(messages)
+        messages.append(HumanMessage(content=transcript))
+        state = {"session_id": session_id, "transcript": transcript, "response": "", "messages": messages,
+                 "session_memory": session_memory, "tools_final": False, "failed": False}
+
+        calls = [prompt_for(state)]
+        if write is not None:
+            call_id = f"call_{uuid.uuid4().hex[:8]}"
+            messages.append(AIMessage(content="", tool_calls=[{"name": "create_task", "args": write, "id": call_id}]))
+            task = session["tasks"].upsert({"id": 1000 + turn, **write})
+            messages.append(ToolMessage(content='{"status": "success"}', tool_call_id=call_id, name="create_task"))
+            if not tp.end_turn_after_tools:
+                # The model is called again after the tool unless the tool result ends the turn
+                calls.append(prompt_for(state))
+            messages.append(AIMessage(content=f"I've added {task.content} to your tasks."))
+        else:
+            messages.append(AIMessage(content="Here's what I found: your top task is task number 1, then task number 2."))
+        session["conversation"].extend(messages[history_length:])
+
+        for index, (prompt, seconds) in enumerate(calls):
+            text = serialize(tp.TOOL_SCHEMAS, prompt)
+            prefix = common_prefix(previous, text)
+            rows.append((turn + 1, index + 1, count(text), count(text[:prefix]), prefix / len(text), seconds))
+            previous = text
+    return rows
+
+def stable_ratio(rows: List[tuple]) -> float:
+    total = sum(row[2] for row in rows)
+    stable = sum(row[3] for row in rows[1:])
+    return stable / max(total - rows[0][2], 1)
+
+def main():
+    os.environ.setdefault("OPENAI_API_KEY", "bench")
+    os.environ.setdefault("ASSEMBLYAI_API_KEY", "bench")
+    args = parse_args()
+    count = token_counter()
+
+    if len(args.tasks) == 1:
+        rows = replay(args, args.tasks[0], count)
+        print(f"{'turn':>5} {'call':>5} {'prompt tokens':>14} {'stable prefix':>14} {'ratio':>7} {'build ms':>9}")
+        for turn, call, tokens, stable, ratio, seconds in rows:
+            print(f"{turn:>5} {call:>5} {tokens:>14} {stable:>14} {ratio:>7.2f} {seconds * 1000:>9.2f}")
+        print(f"\nlayout={args.layout} calls={len(rows)} prompt tokens={sum(row[2] for row in rows)} "
+              f"stable-prefix ratio (after first call)={stable_ratio(rows):.2f}")
+        return
+
+    print(f"{'tasks':>7} {'calls':>6} {'mean tokens':>12} {'max tokens':>11} {'mean build ms':>14} {'max build ms':>13} {'stable':>7}")
+    for task_count in args.tasks:
+        rows = replay(args, task_count, count)
+        tokens = [row[2] for row in rows]
+        build_ms = [row[5] * 1000 for row in rows]
+        print(f"{task_count:>7} {len(rows):>6} {sum(tokens) / len(tokens):>12.0f} {max(tokens):>11} "
+              f"{sum(build_ms) / len(build_ms):>14.2f} {max(build_ms):>13.2f} {stable_ratio(rows):>7.2f}")
+    print(f"\nlayout={args.layout} turns={args.turns}")
+
+if __name__ == "__main__":
+    main()
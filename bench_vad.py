@@ -0,0 +1,73 @@
+"""Benchmark of the voice activity gate at many concurrent streams.
+
+Feeds synthetic 16 kHz PCM (voiced bursts separated by quiet room noise) into
+one VoiceActivityGate per stream, interleaving the streams frame by frame as
+the WebSocket loop would:
+
+    python bench_vad.py --streams 300 --seconds 30
+
+Reports CPU microseconds per audio-second per stream, the fraction of one
+core needed for all streams in real time, and how much audio was forwarded.
+"""
+import argparse
+import os
+import time
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--streams", type=int, default=300, help="concurrent audio streams")
+    parser.add_argument("--seconds", type=float, default=30.0, help="audio per stream")
+    parser.add_argument("--speech-ratio", type=float, default=0.3, help="fraction of the audio that is speech")
+    parser.add_argument("--frame-samples", type=int, default=4096, help="samples per client frame (index.html sends 4096)")
+    return parser.parse_args()
+
+def synthetic_audio(np, seconds: float, speech_ratio: float, seed: int, sample_rate: int = 16000) -> bytes:
+    """Alternating 1-3 s voiced bursts (harmonics of a 120-220 Hz pitch) and quiet noise."""
+    rng = np.random.default_rng(seed)
+    total = int(seconds * sample_rate)
+    audio = rng.normal(0, 30, total)  # room noise, around -60 dBFS
+    position = 0
+    while position < total:
+        burst = int(rng.uniform(1, 3) * sample_rate)
+        gap = int(burst * (1 - speech_ratio) / speech_ratio)
+        position += gap
+        t = np.arange(min(burst, max(total - position, 0))) / sample_rate
+        pitch = rng.uniform(120, 220)
+        voiced = sum(np.sin(2 * np.pi * pitch * k * t) / k for k in range(1, 6))
+        audio[position:position + len(t)] += 4000 * voiced
+        position += burst
+    return np.clip(audio, -32768, 32767).astype(np.int16).tobytes()
+
+def main():
+    os.environ.setdefault("OPENAI_API_KEY", "bench")
+    os.environ.setdefault("ASSEMBLYAI_API_KEY", "bench")
+    import numpy as np
+    from vad import VoiceActivityGate
+
+    args = parse_args()
+    frame_bytes = args.frame_samples * 2
+    # A handful of distinct signals is enough; streams share them but keep their own gate state
+    signals = [synthetic_audio(np, args.seconds, args.speech_ratio, seed) for seed in range(8)]
+    gates = [VoiceActivityGate() for _ in range(args.streams)]
+    frames = len(signals[0]) // frame_bytes
+
+    forwarded = 0
+    started = time.process_time()
+    for index in range(frames):
+        offset = index * frame_bytes
+        for stream, gate in enumerate(gates):
+            signal = signals[stream % len(signals)]
+            forwarded += len(gate.process(signal[offset:offset + frame_bytes]))
+    cpu = time.process_time() - started
+
+    audio_seconds = frames * args.frame_samples / 16000 * args.streams
+    stats = gates[0].stats()
+    print(f"{'streams':>24}: {args.streams}")
+    print(f"{'audio seconds':>24}: {audio_seconds:.0f}")
+    print(f"{'cpu us / audio second':>24}: {cpu / audio_seconds * 1e6:.1f}")
+    print(f"{'cores for real time':>24}: {cpu / (audio_seconds / args.streams):.3f}")
+    print(f"{'speech ratio':>24}: {stats['speech_ratio']:.2f}")
+    print(f"{'forwarded ratio':>24}: {forwarded / (frames * frame_bytes * args.streams):.2f}")
+
+if __name__ == "__main__":
+    main()
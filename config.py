@@ -1,6 +1,5 @@
 import os
 from dotenv import load_dotenv
-from openai import AsyncOpenAI
 import assemblyai as aai
 
 load_dotenv()
@@ -11,4 +10,91 @@ if not assemblyai_api_key or not openai_api_key:
     raise ValueError("API keys not properly set in .env")
 
 aai.settings.api_key = assemblyai_api_key
-openai_client = AsyncOpenAI(api_key=openai_api_key)
\ No newline at end of file
+
+# Task backend connection settings
+backend_base_url = os.getenv("TASK_BACKEND_URL", "https://jarvis.trylenoxinstruments.com")
+backend_max_connections = int(os.getenv("TASK_BACKEND_MAX_CONNECTIONS", "100"))
+backend_max_keepalive = int(os.getenv("TASK_BACKEND_MAX_KEEPALIVE", "20"))
+backend_keepalive_expiry = float(os.getenv("TASK_BACKEND_KEEPALIVE_EXPIRY", "30"))
+backend_connect_timeout = float(os.getenv("TASK_BACKEND_CONNECT_TIMEOUT", "5"))
+backend_timeout = float(os.getenv("TASK_BACKEND_TIMEOUT", "15"))
+backend_max_retries = int(os.getenv("TASK_BACKEND_MAX_RETRIES", "2"))
+backend_retry_backoff = float(os.getenv("TASK_BACKEND_RETRY_BACKOFF", "0.2"))
+
+# Maximum tool calls executed concurrently within one session's turn
+max_parallel_tools = int(os.getenv("MAX_PARALLEL_TOOLS", "4"))
+
+# Maximum in-flight backend requests when a bulk tool fans out writes
+backend_bulk_concurrency = int(os.getenv("TASK_BACKEND_BULK_CONCURRENCY", "8"))
+
+# Approximate token budget and result count for task/project context in the system prompt
+prompt_context_token_budget = int(os.getenv("PROMPT_CONTEXT_TOKEN_BUDGET", "600"))
+prompt_context_top_k = int(os.getenv("PROMPT_CONTEXT_TOP_K", "20"))
+
+# End the turn with the tool-crafted response instead of calling the model again
+end_turn_after_tools = os.getenv("END_TURN_AFTER_TOOLS", "true").lower() in ("1", "true", "yes")
+
+# Audio forwarded to the transcriber in chunks of this many milliseconds (16 kHz PCM)
+audio_chunk_ms = int(os.getenv("AUDIO_CHUNK_MS", "100"))
+# Oldest audio is dropped once more than this much is waiting for the transcriber
+audio_max_buffered_ms = int(os.getenv("AUDIO_MAX_BUFFERED_MS", "2000"))
+
+# What to do with a final transcript that arrives mid-turn: "interrupt" cancels the
+# in-flight turn and answers the new utterance, "queue" merges it into the next turn
+turn_policy = os.getenv("TURN_POLICY", "interrupt").lower()
+
+# Fraction of hot-path debug dumps (model responses, graph results) that are logged
+log_sample_rate = float(os.getenv("LOG_SAMPLE_RATE", "0.01"))
+
+# Session snapshot store shared by workers: "memory" or "sqlite:///path/to/sessions.db"
+session_store_url = os.getenv("SESSION_STORE", "memory")
+# How long a disconnected session's conversation can be resumed (seconds)
+session_resume_ttl = float(os.getenv("SESSION_RESUME_TTL", "3600"))
+
+# Per-session cache of read-only answers
+response_cache_size = int(os.getenv("RESPONSE_CACHE_SIZE", "64"))
+response_cache_ttl = float(os.getenv("RESPONSE_CACHE_TTL", "120"))
+
+# How long weather lookups are reused per city (seconds)
+weather_cache_ttl = float(os.getenv("WEATHER_CACHE_TTL", "300"))
+
+# Conversation history kept per session, and how evicted turns are summarized ("extractive" or "llm")
+conversation_token_budget = int(os.getenv("CONVERSATION_TOKEN_BUDGET", "1500"))
+conversation_summary_tokens = int(os.getenv("CONVERSATION_SUMMARY_TOKENS", "200"))
+conversation_summary_mode = os.getenv("CONVERSATION_SUMMARY_MODE", "extractive").lower()
+
+# "background" serves /health immediately and warms up behind /ready; "eager" warms up before serving
+startup_mode = os.getenv("STARTUP_MODE", "background").lower()
+
+# Optimistic task writes: apply locally, answer immediately and sync to the backend in the background
+write_behind_enabled = os.getenv("WRITE_BEHIND", "false").lower() == "true"
+write_behind_journal = os.getenv("WRITE_BEHIND_JOURNAL", "write_behind.db")
+write_behind_max_attempts = int(os.getenv("WRITE_BEHIND_MAX_ATTEMPTS", "5"))
+# A worker's claim on a journaled write lapses after this long without a send attempt, so
+# writes left claimed by a crashed worker sharing the journal are picked up by another one
+write_behind_claim_ttl = float(os.getenv("WRITE_BEHIND_CLAIM_TTL", "60"))
+
+# Per-user cache of the client's last synced projects/tasks, so reconnects can send just a version
+sync_cache_size = int(os.getenv("SYNC_CACHE_SIZE", "1024"))
+sync_cache_ttl = float(os.getenv("SYNC_CACHE_TTL", "86400"))
+
+# Server-side voice activity gate in front of the transcriber; silence beyond the
+# hangover is dropped except every VAD_KEEP_EVERY-th frame (0 drops it all)
+vad_enabled = os.getenv("VAD_ENABLED", "true").lower() == "true"
+vad_frame_ms = int(os.getenv("VAD_FRAME_MS", "16"))
+vad_energy_threshold_db = float(os.getenv("VAD_ENERGY_THRESHOLD_DB", "-45"))
+vad_zcr_max = float(os.getenv("VAD_ZCR_MAX", "0.35"))
+vad_hangover_ms = int(os.getenv("VAD_HANGOVER_MS", "800"))
+vad_preroll_ms = int(os.getenv("VAD_PREROLL_MS", "240"))
+vad_keep_every = int(os.getenv("VAD_KEEP_EVERY", "10"))
+
+# Opt-in: start the first model call once a partial transcript has been unchanged for
+# SPECULATION_STABLE_MS, and keep it if the final transcript matches
+speculation_enabled = os.getenv("SPECULATION", "false").lower() == "true"
+speculation_stable_ms = int(os.getenv("SPECULATION_STABLE_MS", "300"))
+
+# Admission control per worker: concurrent sessions, largest handshake/sync frame and
+# how long a session may go without speech or messages before it is closed (seconds)
+max_sessions = int(os.getenv("MAX_SESSIONS", "200"))
+max_payload_bytes = int(os.getenv("MAX_PAYLOAD_BYTES", str(1024 * 1024)))
+session_idle_timeout = float(os.getenv("SESSION_IDLE_TIMEOUT", "600"))
@@ -0,0 +1,156 @@
+import asyncio
+from collections import deque
+from itertools import islice
+from typing import Any, Callable, Dict, Iterable, List, Optional
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, SystemMessage, messages_from_dict, messages_to_dict
+from serialization import dumps_text
+import config
+
+_encoding = None
+_summarizer = None
+
+def load_encoding() -> None:
+    """Load the tokenizer; blocking (tiktoken may download its data), so run it in a thread."""
+    global _encoding
+    try:
+        import tiktoken
+        _encoding = tiktoken.get_encoding("cl100k_base")
+    except Exception as e:
+        # No tokenizer data available offline; count_tokens keeps the character estimate
+        print(f"Tokenizer unavailable, estimating tokens from characters: {e}")
+        _encoding = False
+
+def count_tokens(message: BaseMessage) -> int:
+    """Approximate prompt tokens for a message, including tool call arguments.
+
+    Uses ~4 characters per token until ``load_encoding`` has run.
+    """
+    text = message.content if isinstance(message.content, str) else dumps_text(message.content)
+    tool_calls = getattr(message, "tool_calls", None)
+    if tool_calls:
+        text += dumps_text([call.get("args", {}) for call in tool_calls])
+    tokens = len(_encoding.encode(text)) if _encoding else (len(text) + 3) // 4
+    return tokens + 4  # per-message framing overhead
+
+def extractive_summary(previous: str, messages: Iterable[BaseMessage], max_tokens: int) -> str:
+    """Cheap summary: the spoken lines of evicted turns, keeping the most recent text."""
+    lines = [previous] if previous else []
+    for message in messages:
+        if isinstance(message, HumanMessage):
+            lines.append(f"User: {message.content}")
+        elif isinstance(message, AIMessage) and message.content:
+            lines.append(f"Jarvis: {message.content}")
+    text = " ".join(lines)
+    limit = max_tokens * 4
+    return text[-limit:] if len(text) > limit else text
+
+async def llm_summary(previous: str, messages: List[BaseMessage], max_tokens: int) -> str:
+    global _summarizer
+    if _summarizer is None:
+        from langchain_openai import ChatOpenAI
+        _summarizer = ChatOpenAI(model="gpt-3.5-turbo", openai_api_key=config.openai_api_key, max_tokens=max_tokens)
+
+    transcript = extractive_summary("", messages, max_tokens * 4)
+    response = await _summarizer.ainvoke([
+        SystemMessage(content="Update the running summary of a conversation between a user and Jarvis, a task manager assistant. Keep facts the user may refer back to (task names, projects, decisions). Reply with the summary only."),
+        HumanMessage(content=f"Current summary: {previous or 'none'}\n\nNew exchanges: {transcript}"),
+    ])
+    return str(response.content)
+
+class ConversationMemory:
+    """Per-session conversation window trimmed by token budget.
+
+    Messages are evicted a whole turn at a time (from one HumanMessage to the
+    next), so an AIMessage with tool_calls is never separated from its
+    ToolMessages. Evicted turns are folded into a rolling summary in a
+    background task, off the turn's critical path.
+    """
+
+    def __init__(
+        self,
+        messages: Optional[Iterable[BaseMessage]] = None,
+        summary: str = "",
+        token_budget: int = config.conversation_token_budget,
+        summary_tokens: int = config.conversation_summary_tokens,
+    ):
+        self.token_budget = token_budget
+        self.summary_tokens = summary_tokens
+        self.summary = summary
+        self._messages: deque = deque()
+        self._tokens: deque = deque()
+        self.total_tokens = 0
+        # Bumped on every recorded turn, so work computed against older history can be detected
+        self.version = 0
+        self._evicted: List[BaseMessage] = []
+        self._summarizing: Optional[asyncio.Task] = None
+        self.extend(messages or [])
+
+    @property
+    def messages(self) -> List[BaseMessage]:
+        return list(self._messages)
+
+    def __len__(self) -> int:
+        return len(self._messages)
+
+    def extend(self, messages: Iterable[BaseMessage]) -> None:
+        for message in messages:
+            if isinstance(message, SystemMessage):
+                continue
+            tokens = count_tokens(message)
+            self._messages.append(message)
+            self._tokens.append(tokens)
+            self.total_tokens += tokens
+        self.version += 1
+        self._trim()
+
+    def _trim(self) -> None:
+        evicted = False
+        while self.total_tokens > self.token_budget and self._has_older_turn():
+            # Drop the oldest turn: everything up to the next HumanMessage
+            self._evict_one()
+            while self._messages and not isinstance(self._messages[0], HumanMessage):
+                self._evict_one()
+            evicted = True
+        if evicted:
+            self._schedule_summary()
+
+    def _has_older_turn(self) -> bool:
+        # The latest turn is always kept, even if it alone exceeds the budget
+        return any(isinstance(m, HumanMessage) for m in islice(self._messages, 1, None))
+
+    def _evict_one(self) -> None:
+        self._evicted.append(self._messages.popleft())
+        self.total_tokens -= self._tokens.popleft()
+
+    def _schedule_summary(self) -> None:
+        if self._summarizing is not None and not self._summarizing.done():
+            return
+        try:
+            self._summarizing = asyncio.get_running_loop().create_task(self._summarize())
+        except RuntimeError:
+            # No event loop (e.g. restoring a snapshot in a script); summarize inline
+            self.summary = extractive_summary(self.summary, self._evicted, self.summary_tokens)
+            self._evicted.clear()
+
+    async def _summarize(self) -> None:
+        while self._evicted:
+            batch, self._evicted = self._evicted, []
+            if config.conversation_summary_mode == "llm":
+                try:
+                    self.summary = await llm_summary(self.summary, batch, self.summary_tokens)
+                    continue
+                except Exception as e:
+                    print(f"Error summarizing conversation: {e}")
+            self.summary = extractive_summary(self.summary, batch, self.summary_tokens)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return self.snapshot()()
+
+    def snapshot(self) -> Callable[[], Dict[str, Any]]:
+        """Copy the history now; the returned callable serializes the copy (e.g. in a worker thread)."""
+        messages, summary = list(self._messages), self.summary
+        return lambda: {"messages": messages_to_dict(messages), "summary": summary}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "ConversationMemory":
+        return cls(messages_from_dict(data.get("messages", [])), data.get("summary", ""))
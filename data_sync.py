@@ -0,0 +1,112 @@
+import hashlib
+from typing import Any, Dict, List, Optional, Tuple
+import jsonpatch
+import orjson
+from cachetools import TTLCache
+from task_store import TaskStore
+import config
+import metrics
+
+sync_total = metrics.registry.counter("jarvis_sync_total", "Client data sync events, by kind", ("kind",))
+
+class SyncConflict(Exception):
+    """A delta was based on a version the server does not hold; the client must resend a snapshot."""
+
+def user_key(auth_token: Optional[str]) -> str:
+    # The token is the only user identity we see; never keep it around in clear
+    return hashlib.sha256((auth_token or "").encode()).hexdigest()
+
+def content_version(doc: Dict[str, Any]) -> str:
+    """Stable hash of a {"projects", "tasks"} document, for clients that don't track versions."""
+    canonical = orjson.dumps(doc, option=orjson.OPT_SORT_KEYS)
+    return hashlib.sha256(canonical).hexdigest()[:16]
+
+class SnapshotCache:
+    """Last known client data per user, so reconnects can send a version instead of every task.
+
+    Documents are treated as immutable: patches produce a new document, so a
+    cached snapshot can be shared by several sessions of the same user.
+    """
+
+    def __init__(self, maxsize: int = config.sync_cache_size, ttl: float = config.sync_cache_ttl):
+        self._entries: TTLCache = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    def get(self, user: str, version: str) -> Optional[Dict[str, Any]]:
+        entry = self._entries.get(user)
+        if entry is None or entry[0] != version:
+            return None
+        return entry[1]
+
+    def put(self, user: str, version: str, doc: Dict[str, Any]) -> None:
+        self._entries[user] = (version, doc)
+
+snapshot_cache = SnapshotCache()
+
+def resolve_handshake(user: str, message: Dict[str, Any]) -> Tuple[Optional[str], Optional[Dict[str, Any]]]:
+    """Work out the session's starting data from the first client message.
+
+    Returns ``(version, doc)``; ``doc`` is None when the client only sent a
+    version the cache doesn't hold and a full snapshot has to be requested.
+    """
+    version = message.get("dataVersion")
+    if "projects" in message or "tasks" in message:
+        doc = {"projects": message.get("projects", []), "tasks": message.get("tasks", [])}
+        version = str(version) if version is not None else content_version(doc)
+        snapshot_cache.put(user, version, doc)
+        sync_total.inc("snapshot")
+        return version, doc
+    if version is None:
+        return None, {"projects": [], "tasks": []}
+    doc = snapshot_cache.get(user, str(version))
+    sync_total.inc("cache_hit" if doc is not None else "cache_miss")
+    return str(version), doc
+
+def _task_index(tasks: List[Dict[str, Any]]) -> Optional[Dict[str, Dict[str, Any]]]:
+    if any(not isinstance(task, dict) or "id" not in task for task in tasks):
+        return None
+    return {str(task["id"]): task for task in tasks}
+
+def apply_to_session(session: Dict[str, Any], doc: Dict[str, Any], version: str) -> None:
+    """Bring a live session in line with a new client document, touching only what changed."""
+    old = _task_index(session["sync_doc"]["tasks"])
+    new = _task_index(doc["tasks"])
+    if old is None or new is None:
+        # Without ids there is nothing to diff against; rebuild the index
+        session["tasks"] = TaskStore(doc["tasks"])
+    else:
+        tasks = session["tasks"]
+        for key in old.keys() - new.keys():
+            tasks.remove(key)
+        for key, task in new.items():
+            if old.get(key) != task:
+                tasks.upsert(task, key=key)
+    # Projects may be renamed or removed, not just appended; mutate in place for tools holding the list
+    session["projects"][:] = doc["projects"]
+    session["sync_doc"] = doc
+    session["sync_version"] = version
+    session["sync_generation"] = session.get("sync_generation", 0) + 1
+
+def apply_message(user: str, session: Dict[str, Any], message: Dict[str, Any]) -> str:
+    """Handle a mid-session ``patch`` or ``snapshot`` frame; returns the new version.
+
+    A patch must name the version it was computed against (``baseVersion``);
+    anything else raises SyncConflict so the client falls back to a snapshot.
+    """
+    if message["type"] == "snapshot":
+        doc = {"projects": message.get("projects", []), "tasks": message.get("tasks", [])}
+        version = str(message["version"]) if message.get("version") is not None else content_version(doc)
+        sync_total.inc("snapshot")
+    else:
+        if str(message.get("baseVersion")) != session.get("sync_version"):
+            sync_total.inc("conflict")
+            raise SyncConflict(f"patch based on {message.get('baseVersion')}, session is at {session.get('sync_version')}")
+        try:
+            doc = jsonpatch.apply_patch(session["sync_doc"], message.get("ops", []))
+        except (jsonpatch.JsonPatchException, jsonpatch.JsonPointerException) as e:
+            sync_total.inc("conflict")
+            raise SyncConflict(f"patch does not apply: {e}") from e
+        version = str(message["version"]) if message.get("version") is not None else content_version(doc)
+        sync_total.inc("patch")
+    apply_to_session(session, doc, version)
+    snapshot_cache.put(user, version, doc)
+    return version
@@ -0,0 +1,53 @@
+import re
+from typing import Dict, Optional
+
+# Optional wake word / filler the transcriber often keeps at the start of an utterance
+_PREFIX = r"^(?:(?:hey|ok|okay)\s+)?(?:jarvis\s+)?(?:please\s+)?"
+_ASK = r"(?:what\s+are|what's|what\s+is|show(?:\s+me)?|list|tell\s+me|read(?:\s+me)?|give\s+me)"
+_SUFFIX = r"(?:\s+(?:please|for\s+me|right\s+now))?$"
+
+# Utterance patterns that map directly to a read-only tool with no arguments
+INTENT_PATTERNS = [
+    (re.compile(_PREFIX + _ASK + r"\s+(?:all\s+)?(?:of\s+)?(?:my|the)\s+(?:current\s+)?tasks" + _SUFFIX), "get_current_tasks"),
+    (re.compile(_PREFIX + _ASK + r"\s+(?:all\s+)?(?:of\s+)?(?:my|the)\s+(?:current\s+)?projects" + _SUFFIX), "get_current_projects"),
+]
+
+_NORMALIZE = re.compile(r"[^\w\s']+")
+
+def normalize(transcript: str) -> str:
+    """Lowercase and strip punctuation so 'What are my tasks?' matches."""
+    return " ".join(_NORMALIZE.sub(" ", transcript.lower()).split())
+
+class IntentRouter:
+    """Deterministic matcher for commands that don't need the LLM."""
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.hit_seconds = 0.0
+
+    def match(self, transcript: str) -> Optional[str]:
+        """Return the tool name for a high-confidence intent, or None."""
+        text = normalize(transcript)
+        for pattern, tool_name in INTENT_PATTERNS:
+            if pattern.match(text):
+                self.hits += 1
+                return tool_name
+        self.misses += 1
+        return None
+
+    def record_latency(self, seconds: float) -> None:
+        self.hit_seconds += seconds
+
+    def stats(self) -> Dict[str, float]:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            # A routed turn skips the agent -> tools -> agent round trip
+            "model_calls_saved": self.hits * 2,
+            "avg_hit_latency_ms": (self.hit_seconds / self.hits * 1000) if self.hits else 0.0,
+        }
+
+intent_router = IntentRouter()
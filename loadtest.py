@@ -0,0 +1,301 @@
+"""End-to-end load test for the Jarvis WebSocket service using local stand-ins.
+
+Runs the FastAPI ``app`` from main.py in-process with a fake AssemblyAI
+transcriber, a fake chat model and a local mock of the task backend, then
+drives N concurrent WebSocket clients through scripted turns.
+
+    python loadtest.py --clients 100 --turns 5 --model-latency 0.3
+
+Reports turns/sec, p50/p95/p99 turn latency, time to first chunk and
+resident memory per session. No API keys or network access are needed.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import threading
+import time
+import uuid
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional
+
+SCRIPT = [
+    "What are my tasks?",
+    "Add buy milk to my inbox",
+    "What should I focus on today?",
+    "List my projects",
+]
+
+BYTES_PER_MS = 32  # 16 kHz, 16-bit mono PCM
+# Trailing silence after each utterance; long enough to reach the transcriber through the VAD hangover
+SILENCE_MS = 400
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=20, help="concurrent WebSocket sessions")
+    parser.add_argument("--turns", type=int, default=4, help="turns per session")
+    parser.add_argument("--tasks", type=int, default=50, help="tasks sent in each session's handshake")
+    parser.add_argument("--utterance-ms", type=int, default=1000, help="audio sent per utterance")
+    parser.add_argument("--transcriber-latency", type=float, default=0.05, help="fake endpointing delay after silence (s)")
+    parser.add_argument("--model-latency", type=float, default=0.2, help="fake model time to first token (s)")
+    parser.add_argument("--token-latency", type=float, default=0.01, help="fake model delay per streamed token (s)")
+    parser.add_argument("--backend-latency", type=float, default=0.03, help="mock task backend latency (s)")
+    parser.add_argument("--app-port", type=int, default=8765)
+    parser.add_argument("--backend-port", type=int, default=8766)
+    parser.add_argument("--frame-format", choices=("json", "msgpack"), default="json", help="server frame encoding to negotiate")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    return parser.parse_args()
+
+def rss_bytes() -> int:
+    """Resident set size of this process."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+def percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+class FakeTranscriber:
+    """Stand-in for aai.RealtimeTranscriber that emits the next scripted line
+    when silence follows streamed speech, like real endpointing.
+
+    Byte counts can't be used to find utterance boundaries: the VAD and the
+    audio pipeline both hold back partial frames, so the transcriber never
+    sees exactly what the client sent.
+    """
+
+    latency = 0.05
+
+    def __init__(self, sample_rate: int, on_data, on_error=None, on_open=None, on_close=None, **kwargs):
+        self.on_data = on_data
+        self.on_open = on_open
+        self.on_close = on_close
+        self.received_ms = 0
+        self.speech_started_ms: Optional[int] = None
+        self.turn = 0
+
+    def connect(self):
+        if self.on_open:
+            self.on_open(SimpleNamespace(session_id=str(uuid.uuid4())))
+
+    def stream(self, data: bytes):
+        start_ms = self.received_ms
+        self.received_ms += len(data) // BYTES_PER_MS
+        if data.count(0) < len(data) // 2:
+            # Mostly non-zero: speech (the clients send noise as speech)
+            if self.speech_started_ms is None:
+                self.speech_started_ms = start_ms
+            return
+        if self.speech_started_ms is not None:
+            text = SCRIPT[self.turn % len(SCRIPT)]
+            self.turn += 1
+            transcript = SimpleNamespace(
+                text=text,
+                message_type="RealtimeMessageTypes.final_transcript",
+                audio_start=self.speech_started_ms,
+                audio_end=start_ms,
+            )
+            self.speech_started_ms = None
+            # The real SDK calls back from its own thread after endpointing
+            threading.Timer(self.latency, self.on_data, (transcript,)).start()
+
+    def close(self):
+        if self.on_close:
+            self.on_close()
+
+def build_fake_model(first_token_latency: float, token_latency: float):
+    from langchain_core.language_models.chat_models import BaseChatModel
+    from langchain_core.messages import AIMessage, AIMessageChunk, HumanMessage, ToolMessage
+    from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+    class FakeChatModel(BaseChatModel):
+        """Scripted chat model: 'add ...' becomes a create_task call, anything else a short reply."""
+
+        @property
+        def _llm_type(self) -> str:
+            return "fake-loadtest"
+
+        def _reply(self, messages) -> AIMessage:
+            last = messages[-1]
+            if isinstance(last, HumanMessage) and last.content.lower().startswith("add "):
+                content = last.content[4:].split(" to ")[0]
+                return AIMessage(content="", tool_calls=[{
+                    "name": "create_task",
+                    "args": {"content": content, "description": "", "priority": 1, "project_id": 1},
+                    "id": f"call_{uuid.uuid4().hex[:12]}",
+                }])
+            if isinstance(last, ToolMessage):
+                return AIMessage(content="Done. Anything else?")
+            return AIMessage(content="Start with your highest priority task. Then clear your inbox. You've got this.")
+
+        def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+            time.sleep(first_token_latency)
+            return ChatResult(generations=[ChatGeneration(message=self._reply(messages))])
+
+        async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+            await asyncio.sleep(first_token_latency)
+            return ChatResult(generations=[ChatGeneration(message=self._reply(messages))])
+
+        async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+            await asyncio.sleep(first_token_latency)
+            reply = self._reply(messages)
+            if reply.tool_calls:
+                call = reply.tool_calls[0]
+                yield ChatGenerationChunk(message=AIMessageChunk(content="", tool_call_chunks=[{
+                    "name": call["name"], "args": json.dumps(call["args"]), "id": call["id"], "index": 0,
+                }]))
+                return
+            for token in reply.content.split(" "):
+                await asyncio.sleep(token_latency)
+                yield ChatGenerationChunk(message=AIMessageChunk(content=token + " "))
+
+    return FakeChatModel()
+
+def build_backend_app(latency: float):
+    from fastapi import FastAPI, Request
+
+    backend = FastAPI()
+    counter = {"id": 1000}
+
+    @backend.post("/todo/tasks/")
+    async def create_task(request: Request):
+        await asyncio.sleep(latency)
+        counter["id"] += 1
+        return {"id": counter["id"], **(await request.json())}
+
+    @backend.put("/todo/tasks/{task_id}")
+    async def update_task(task_id: str, request: Request):
+        await asyncio.sleep(latency)
+        return {"id": task_id, **(await request.json())}
+
+    @backend.post("/todo/projects/")
+    async def create_project(request: Request):
+        await asyncio.sleep(latency)
+        counter["id"] += 1
+        return {"id": counter["id"], **(await request.json())}
+
+    return backend
+
+async def serve(app, port: int):
+    import uvicorn
+
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning", ws_max_size=2 ** 24))
+    task = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.01)
+    return server, task
+
+async def run_client(args, url: str, connected: asyncio.Barrier, results: Dict[str, List[float]]):
+    import websockets
+    import ormsgpack
+
+    def decode(frame):
+        return ormsgpack.unpackb(frame) if isinstance(frame, bytes) else json.loads(frame)
+
+    noise = bytes(random.getrandbits(8) for _ in range(100 * BYTES_PER_MS))
+    silence = bytes(100 * BYTES_PER_MS)
+    frames_per_utterance = args.utterance_ms // 100
+    tasks = [{"id": i, "content": f"task number {i}", "project_id": 1} for i in range(args.tasks)]
+
+    async with websockets.connect(url, max_size=None) as ws:
+        # A distinct user per client, so sessions never share cached data or backend identity
+        await ws.send(json.dumps({"authToken": f"loadtest-{uuid.uuid4().hex}", "projects": ["Inbox"], "tasks": tasks, "frameFormat": args.frame_format}))
+        await connected.wait()
+        for _ in range(args.turns):
+            for _ in range(frames_per_utterance):
+                await ws.send(noise)
+            for _ in range(SILENCE_MS // 100):
+                await ws.send(silence)
+            sent_at = time.perf_counter()
+            first_chunk: Optional[float] = None
+            while True:
+                message = decode(await ws.recv())
+                if message["type"] == "chunk" and first_chunk is None:
+                    first_chunk = time.perf_counter() - sent_at
+                if message["type"] in ("end", "error", "cancelled"):
+                    break
+            results["turn"].append(time.perf_counter() - sent_at)
+            if first_chunk is not None:
+                results["first_chunk"].append(first_chunk)
+            results[message["type"]].append(1)
+
+async def main_async(args) -> Dict[str, Any]:
+    import assemblyai as aai
+    import transcript_processor
+    import main
+
+    FakeTranscriber.latency = args.transcriber_latency
+    aai.RealtimeTranscriber = FakeTranscriber
+    transcript_processor.model = build_fake_model(args.model_latency, args.token_latency)
+
+    backend_server, backend_task = await serve(build_backend_app(args.backend_latency), args.backend_port)
+    app_server, app_task = await serve(main.app, args.app_port)
+
+    results: Dict[str, List[float]] = {"turn": [], "first_chunk": [], "end": [], "error": [], "cancelled": []}
+    baseline_rss = rss_bytes()
+
+    connected = asyncio.Barrier(args.clients + 1)
+    started = time.perf_counter()
+    clients = [
+        asyncio.create_task(run_client(args, f"ws://127.0.0.1:{args.app_port}/ws", connected, results))
+        for _ in range(args.clients)
+    ]
+    # Every client has connected and sent its handshake; let the server finish setting up sessions
+    await asyncio.wait_for(connected.wait(), timeout=60)
+    await asyncio.sleep(0.2)
+    session_rss = rss_bytes()
+    outcomes = await asyncio.gather(*clients, return_exceptions=True)
+    elapsed = time.perf_counter() - started
+
+    app_server.should_exit = True
+    backend_server.should_exit = True
+    await asyncio.gather(app_task, backend_task)
+
+    failures = [o for o in outcomes if isinstance(o, BaseException)]
+    turns = results["turn"]
+    report = {
+        "clients": args.clients,
+        "turns": len(turns),
+        "client_failures": len(failures),
+        "errors": len(results["error"]),
+        "cancelled": len(results["cancelled"]),
+        "turns_per_sec": len(turns) / elapsed if elapsed else 0.0,
+        "turn_p50_ms": percentile(turns, 50) * 1000,
+        "turn_p95_ms": percentile(turns, 95) * 1000,
+        "turn_p99_ms": percentile(turns, 99) * 1000,
+        "first_chunk_p50_ms": percentile(results["first_chunk"], 50) * 1000,
+        "first_chunk_p95_ms": percentile(results["first_chunk"], 95) * 1000,
+        "turn_mean_ms": statistics.mean(turns) * 1000 if turns else 0.0,
+        "memory_per_session_kb": (session_rss - baseline_rss) / args.clients / 1024,
+    }
+    if failures:
+        report["first_failure"] = repr(failures[0])
+    return report
+
+def main():
+    args = parse_args()
+    # Configuration is read at import time, so point it at the stand-ins first
+    os.environ.setdefault("OPENAI_API_KEY", "loadtest")
+    os.environ.setdefault("ASSEMBLYAI_API_KEY", "loadtest")
+    os.environ["TASK_BACKEND_URL"] = f"http://127.0.0.1:{args.backend_port}"
+    # Measure the service, not admission control (set MAX_SESSIONS explicitly to test rejection)
+    os.environ.setdefault("MAX_SESSIONS", str(max(args.clients, 200)))
+
+    report = asyncio.run(main_async(args))
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+    for key, value in report.items():
+        print(f"{key:>24}: {value:.1f}" if isinstance(value, float) else f"{key:>24}: {value}")
+
+if __name__ == "__main__":
+    main()
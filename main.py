@@ -1,17 +1,77 @@
+import time
+_import_started = time.perf_counter()
+
 import asyncio
+import logging
 import os
+import sys
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request
 from fastapi.templating import Jinja2Templates
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
 from dotenv import load_dotenv
-from websocket_handler import websocket_endpoint, get_active_sessions
+from websocket_handler import websocket_endpoint, get_active_sessions, get_session_details, session_memory
+from backend_client import backend_client
+from session_store import session_store, worker_id
+from intent_router import intent_router
+import metrics
+import warmup
+from config import startup_mode, max_payload_bytes
+from write_behind import write_behind_queue
+from session_manager import session_manager
+
+warmup.startup_timings["import_main"] = time.perf_counter() - _import_started
 
 # Load environment variables
 load_dotenv()
+logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO").upper())
+
+# Point-in-time values exported alongside the latency histograms on /metrics
+metrics.registry.gauges(lambda: {
+    "jarvis_active_sessions": len(session_memory),
+    "jarvis_admitted_sessions": session_manager.admitted,
+    "jarvis_graph_turns_total": metrics.graph_stats["turns"],
+    "jarvis_model_calls_total": metrics.graph_stats["model_calls"],
+    "jarvis_model_calls_saved_total": metrics.graph_stats["model_calls_saved"] + intent_router.stats()["model_calls_saved"],
+    "jarvis_ready": 1 if warmup.is_ready() else 0,
+    "jarvis_intent_router_hits_total": intent_router.hits,
+    "jarvis_intent_router_misses_total": intent_router.misses,
+    "jarvis_write_behind_pending": write_behind_queue.pending() if write_behind_queue is not None else 0,
+})
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Open shared connection pools and warm up the agent; close pools on shutdown."""
+    await backend_client.start()
+    # A previous process with this pid (or this one, restarted) may have left sessions registered
+    await asyncio.to_thread(session_store.clear_worker, worker_id)
+    if write_behind_queue is not None and write_behind_queue.pending():
+        # Writes acknowledged before a restart are still owed to the backend; the journal
+        # holds no auth tokens, so each user's writes resume when they reconnect
+        print(f"Write-behind: {write_behind_queue.pending()} journaled writes waiting for their users to reconnect")
+    sweeper = asyncio.create_task(session_manager.run_idle_sweeper())
+    warm_task = None
+    if startup_mode == "eager":
+        await warmup.warm_up()
+    else:
+        warm_task = asyncio.create_task(warmup.warm_up())
+    try:
+        yield
+    finally:
+        sweeper.cancel()
+        if warm_task is not None and not warm_task.done():
+            warm_task.cancel()
+        if write_behind_queue is not None:
+            await write_behind_queue.stop()
+        await backend_client.close()
+        weather_tool = sys.modules.get("tools.weather_tool")
+        if weather_tool is not None:
+            await weather_tool.close_weather_client()
+        session_store.clear_worker(worker_id)
 
 # Create FastAPI app
-app = FastAPI(title="Jarvis Task Manager", version="1.0.0")
+app = FastAPI(title="Jarvis Task Manager", version="1.0.0", lifespan=lifespan)
 
 # Setup templates
 templates = Jinja2Templates(directory="templates")
@@ -31,17 +91,34 @@ async def health_check():
     return {
         "status": "healthy",
         "message": "Jarvis Task Manager is running",
-        "sessions": get_active_sessions()
+        "sessions": get_active_sessions(),
+        "intent_router": intent_router.stats(),
+        "graph": metrics.graph_stats
     }
 
+@app.get("/ready")
+async def readiness_check():
+    """Readiness endpoint: 200 only once the agent is imported, compiled and connected."""
+    status = {"ready": warmup.is_ready(), "startup_timings": warmup.startup_timings, "startup_error": warmup.startup_error}
+    return JSONResponse(status, status_code=200 if status["ready"] else 503)
+
 @app.get("/sessions")
 async def get_sessions():
     """Get active sessions info for debugging."""
-    return get_active_sessions()
+    return await get_session_details()
+
+@app.get("/metrics")
+async def get_metrics():
+    """Prometheus metrics endpoint."""
+    return PlainTextResponse(metrics.registry.render(), media_type="text/plain; version=0.0.4")
 
 # WebSocket endpoint
 app.websocket("/ws")(websocket_endpoint)
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000, log_level="info")
\ No newline at end of file
+    workers = int(os.getenv("WORKERS", "1"))
+    # Multiple workers need an import string and a shared SESSION_STORE (e.g. sqlite:///sessions.db)
+    uvicorn.run("main:app" if workers > 1 else app, host="0.0.0.0", port=8000, log_level="info", workers=workers,
+                # Oversized frames are refused by the protocol layer before they are buffered
+                ws_max_size=max_payload_bytes)
\ No newline at end of file
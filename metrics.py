@@ -0,0 +1,125 @@
+import bisect
+import logging
+import random
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+import config
+
+# Latency buckets in seconds, tuned for voice turns (sub-10ms tool lookups up to slow LLM calls)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+LabelValues = Tuple[str, ...]
+
+def _format_labels(names: Iterable[str], values: Iterable[str]) -> str:
+    pairs = [f'{n}="{v}"' for n, v in zip(names, values)]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+class Counter:
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, *label_values: str, amount: float = 1.0) -> None:
+        self._values[label_values] = self._values.get(label_values, 0.0) + amount
+
+    def value(self, *label_values: str) -> float:
+        return self._values.get(label_values, 0.0)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for values, total in self._values.items():
+            lines.append(f"{self.name}{_format_labels(self.labels, values)} {total}")
+        return lines
+
+class Histogram:
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...] = (), buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.buckets = buckets
+        # label values -> [bucket counts..., sum, count]
+        self._series: Dict[LabelValues, List[float]] = {}
+
+    def observe(self, seconds: float, *label_values: str) -> None:
+        series = self._series.get(label_values)
+        if series is None:
+            series = self._series[label_values] = [0] * len(self.buckets) + [0.0, 0]
+        index = bisect.bisect_left(self.buckets, seconds)
+        if index < len(self.buckets):
+            series[index] += 1
+        series[-2] += seconds
+        series[-1] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for values, series in self._series.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                labels = _format_labels(self.labels + ("le",), values + (str(bound),))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labels + ("le",), values + ("+Inf",))
+            lines.append(f"{self.name}_bucket{labels} {series[-1]}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labels, values)} {series[-2]}")
+            lines.append(f"{self.name}_count{_format_labels(self.labels, values)} {series[-1]}")
+        return lines
+
+class Registry:
+    def __init__(self):
+        self._metrics: List[object] = []
+        self._gauges: List[Callable[[], Dict[str, float]]] = []
+
+    def counter(self, name: str, help: str, labels: Tuple[str, ...] = ()) -> Counter:
+        metric = Counter(name, help, labels)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name: str, help: str, labels: Tuple[str, ...] = ()) -> Histogram:
+        metric = Histogram(name, help, labels)
+        self._metrics.append(metric)
+        return metric
+
+    def gauges(self, collect: Callable[[], Dict[str, float]]) -> None:
+        """Register a callback returning {metric_name: value} sampled at scrape time."""
+        self._gauges.append(collect)
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        for collect in self._gauges:
+            for name, value in collect().items():
+                lines.append(f"# TYPE {name} gauge")
+                lines.append(f"{name} {float(value)}")
+        return "\n".join(lines) + "\n"
+
+registry = Registry()
+
+# Per-stage latency histograms
+transcription_seconds = registry.histogram("jarvis_transcription_seconds", "Audio sent to transcriber until final transcript")
+turn_queue_seconds = registry.histogram("jarvis_turn_queue_seconds", "Final transcript until turn processing starts")
+model_call_seconds = registry.histogram("jarvis_model_call_seconds", "Duration of each chat model call")
+tool_call_seconds = registry.histogram("jarvis_tool_call_seconds", "Duration of each tool call", ("tool",))
+first_chunk_seconds = registry.histogram("jarvis_first_chunk_seconds", "Turn start until first response chunk is sent")
+turn_seconds = registry.histogram("jarvis_turn_seconds", "Turn start until end frame is sent")
+speculation_saved_seconds = registry.histogram("jarvis_speculation_saved_seconds", "Model time already spent by a committed speculation when the final transcript arrived")
+
+# Transcript and turn counters
+transcripts_total = registry.counter("jarvis_transcripts_total", "Final transcripts handled, by outcome", ("outcome",))
+turns_total = registry.counter("jarvis_turns_total", "Turns processed, by outcome", ("outcome",))
+speculations_total = registry.counter("jarvis_speculations_total", "Speculative model calls on partial transcripts, by outcome", ("outcome",))
+
+# Per-process counters for graph turns and model calls
+graph_stats = {"turns": 0, "model_calls": 0, "model_calls_saved": 0}
+
+# Leveled, sampled logging for hot-path debug dumps
+logger = logging.getLogger("jarvis")
+
+def log_sampled(level: int, message: Callable[[], str], rate: Optional[float] = None) -> None:
+    """Log ``message()`` for a sample of calls; the message is only built when emitted."""
+    if not logger.isEnabledFor(level):
+        return
+    if random.random() >= (config.log_sample_rate if rate is None else rate):
+        return
+    logger.log(level, message())
@@ -0,0 +1,45 @@
+from typing import Any, Dict, Optional, Tuple
+from cachetools import TTLCache
+from intent_router import normalize
+import config
+import metrics
+
+cache_lookups = metrics.registry.counter("jarvis_response_cache_total", "Response cache lookups, by outcome", ("outcome",))
+
+def data_version(session: Dict[str, Any]) -> Tuple[int, int, int]:
+    """Changes whenever the session's tasks or projects change.
+
+    Tools only ever append projects; client syncs may rewrite them (or replace the
+    TaskStore), which is covered by the sync generation.
+    """
+    return session.get("sync_generation", 0), session["tasks"].version, len(session["projects"])
+
+class ResponseCache:
+    """Per-session LRU/TTL cache of answers to read-only utterances.
+
+    Only answers produced from get_current_* results are stored; those depend on
+    the session's data, not on what was said earlier in the conversation.
+
+    Keys include the session's data version, so any write through the tools
+    makes earlier answers unreachable without explicit invalidation.
+    """
+
+    def __init__(self, maxsize: int = config.response_cache_size, ttl: float = config.response_cache_ttl):
+        self._entries: TTLCache = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    def get(self, session: Dict[str, Any], transcript: str) -> Optional[str]:
+        response = self._entries.get((normalize(transcript), data_version(session)))
+        cache_lookups.inc("hit" if response is not None else "miss")
+        return response
+
+    def put(self, session: Dict[str, Any], transcript: str, response: str) -> None:
+        self._entries[(normalize(transcript), data_version(session))] = response
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+def session_cache(session: Dict[str, Any]) -> ResponseCache:
+    cache = session.get("response_cache")
+    if cache is None:
+        cache = session["response_cache"] = ResponseCache()
+    return cache
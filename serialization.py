@@ -0,0 +1,62 @@
+from typing import Any, Dict, Union
+import orjson
+import ormsgpack
+from fastapi import WebSocket
+
+FRAME_FORMATS = ("json", "msgpack")
+
+def dumps(obj: Any) -> bytes:
+    """orjson encoding; anything it can't serialize natively (e.g. Decimal) is stringified."""
+    return orjson.dumps(obj, default=str)
+
+def dumps_text(obj: Any) -> str:
+    """Compact JSON text, e.g. for ToolMessage content the model reads back."""
+    return orjson.dumps(obj, default=str).decode()
+
+def loads(data: Union[str, bytes]) -> Any:
+    return orjson.loads(data)
+
+class FrameCodec:
+    """Encodes outbound WebSocket frames in the format negotiated at handshake.
+
+    "json" frames go out as text (what browsers expect from ``JSON.parse``);
+    "msgpack" frames go out as binary. Constant frames are encoded once.
+    """
+
+    def __init__(self, format: str = "json"):
+        if format not in FRAME_FORMATS:
+            raise ValueError(f"Unsupported frame format: {format}")
+        self.format = format
+        self._end = self.encode({"type": "end", "text": ""})
+
+    def encode(self, frame: Dict[str, Any]) -> Union[str, bytes]:
+        if self.format == "msgpack":
+            return ormsgpack.packb(frame, default=str)
+        return dumps_text(frame)
+
+    async def _send_encoded(self, websocket: WebSocket, data: Union[str, bytes]) -> None:
+        # Straight to the ASGI send; WebSocket.send_text/send_bytes would only re-wrap the same message
+        key = "bytes" if isinstance(data, bytes) else "text"
+        await websocket.send({"type": "websocket.send", key: data})
+
+    async def send(self, websocket: WebSocket, frame: Dict[str, Any]) -> None:
+        await self._send_encoded(websocket, self.encode(frame))
+
+    async def send_end(self, websocket: WebSocket) -> None:
+        await self._send_encoded(websocket, self._end)
+
+JSON_CODEC = FrameCodec("json")
+MSGPACK_CODEC = FrameCodec("msgpack")
+
+def negotiate(requested: Any) -> FrameCodec:
+    """Codec for the client's ``frameFormat``; unknown or missing values fall back to JSON."""
+    return MSGPACK_CODEC if requested == "msgpack" else JSON_CODEC
+
+def codec_for(websocket: WebSocket) -> FrameCodec:
+    return getattr(websocket.state, "frame_codec", JSON_CODEC)
+
+async def send_frame(websocket: WebSocket, frame: Dict[str, Any]) -> None:
+    await codec_for(websocket).send(websocket, frame)
+
+async def send_end(websocket: WebSocket) -> None:
+    await codec_for(websocket).send_end(websocket)
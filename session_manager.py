@@ -0,0 +1,101 @@
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+from serialization import dumps
+import config
+import metrics
+
+sessions_rejected = metrics.registry.counter("jarvis_sessions_rejected_total", "WebSocket sessions refused, by reason", ("reason",))
+sessions_evicted = metrics.registry.counter("jarvis_sessions_evicted_total", "Sessions closed for inactivity")
+
+# Rough ratio of in-memory Python objects (dicts, index postings, message objects) to their JSON size
+OBJECT_OVERHEAD = 3
+
+Evictor = Callable[[], Awaitable[None]]
+
+class SessionManager:
+    """Per-worker admission control and idle eviction for WebSocket sessions.
+
+    Slots are taken before the WebSocket is accepted, so a full worker refuses
+    new connections without doing any per-session setup. Sessions report
+    activity with ``touch``; a background sweep calls the evictor of any
+    session idle for longer than ``idle_timeout``.
+    """
+
+    def __init__(
+        self,
+        max_sessions: int = config.max_sessions,
+        idle_timeout: float = config.session_idle_timeout,
+        max_payload_bytes: int = config.max_payload_bytes,
+    ):
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+        self.max_payload_bytes = max_payload_bytes
+        self.admitted = 0
+        self._last_activity: Dict[str, float] = {}
+        self._evictors: Dict[str, Evictor] = {}
+
+    def try_admit(self) -> bool:
+        if self.admitted >= self.max_sessions:
+            sessions_rejected.inc("capacity")
+            return False
+        self.admitted += 1
+        return True
+
+    def release(self, session_id: Optional[str]) -> None:
+        self.admitted -= 1
+        if session_id is not None:
+            self._last_activity.pop(session_id, None)
+            self._evictors.pop(session_id, None)
+
+    def payload_allowed(self, size: int) -> bool:
+        if size > self.max_payload_bytes:
+            sessions_rejected.inc("payload")
+            return False
+        return True
+
+    def register(self, session_id: str, evict: Evictor) -> None:
+        self._evictors[session_id] = evict
+        self.touch(session_id)
+
+    def touch(self, session_id: str) -> None:
+        self._last_activity[session_id] = time.monotonic()
+
+    def idle_seconds(self, session_id: str) -> float:
+        last = self._last_activity.get(session_id)
+        return time.monotonic() - last if last is not None else 0.0
+
+    async def run_idle_sweeper(self) -> None:
+        """Evict idle sessions until cancelled."""
+        interval = max(self.idle_timeout / 4, 1.0)
+        while True:
+            await asyncio.sleep(interval)
+            cutoff = time.monotonic() - self.idle_timeout
+            for session_id, last in list(self._last_activity.items()):
+                evict = self._evictors.get(session_id)
+                if last >= cutoff or evict is None:
+                    continue
+                print(f"Evicting idle session: {session_id}")
+                sessions_evicted.inc()
+                self._evictors.pop(session_id, None)
+                try:
+                    await evict()
+                except Exception as e:
+                    print(f"Error evicting session {session_id}: {e}")
+
+def estimate_session_memory(session: Dict[str, Any], audio_buffered_bytes: int = 0) -> Dict[str, int]:
+    """Approximate memory held by one session, from the JSON size of its data."""
+    tasks_bytes = len(dumps(session["tasks"].to_list()))
+    projects_bytes = len(dumps(session["projects"]))
+    sync_bytes = len(dumps(session["sync_doc"])) if session.get("sync_doc") else 0
+    conversation_bytes = session["conversation"].total_tokens * 4  # ~4 characters per token
+    return {
+        "tasks_bytes": tasks_bytes * OBJECT_OVERHEAD,
+        "projects_bytes": projects_bytes * OBJECT_OVERHEAD,
+        "sync_snapshot_bytes": sync_bytes * OBJECT_OVERHEAD,
+        "conversation_bytes": conversation_bytes * OBJECT_OVERHEAD,
+        "audio_buffer_bytes": audio_buffered_bytes,
+        "estimated_total_bytes": (tasks_bytes + projects_bytes + sync_bytes + conversation_bytes) * OBJECT_OVERHEAD + audio_buffered_bytes,
+    }
+
+session_manager = SessionManager()
@@ -0,0 +1,159 @@
+from abc import ABC, abstractmethod
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+import config
+import data_sync
+
+class SessionStore(ABC):
+    """Where session snapshots and liveness live beyond a single worker process.
+
+    Live session objects (TaskStore, transcriber, pipelines) always stay in the
+    owning worker's ``session_memory``; the store holds JSON snapshots so any
+    worker can list sessions and resume a conversation after a reconnect.
+    """
+
+    @abstractmethod
+    def register(self, session_id: str, info: Dict[str, Any]) -> None:
+        ...
+
+    @abstractmethod
+    def unregister(self, session_id: str) -> None:
+        ...
+
+    @abstractmethod
+    def save(self, session_id: str, snapshot: Dict[str, Any]) -> None:
+        ...
+
+    @abstractmethod
+    def load(self, session_id: str) -> Optional[Dict[str, Any]]:
+        ...
+
+    @abstractmethod
+    def active_sessions(self) -> List[Dict[str, Any]]:
+        ...
+
+    def clear_worker(self, worker: int) -> None:
+        """Forget sessions registered by a worker that is starting up or shutting down."""
+        for info in self.active_sessions():
+            if info.get("worker") == worker:
+                self.unregister(info["session_id"])
+
+class InMemorySessionStore(SessionStore):
+    """Single-process default."""
+
+    def __init__(self, ttl: float = config.session_resume_ttl):
+        self.ttl = ttl
+        self._active: Dict[str, Dict[str, Any]] = {}
+        self._snapshots: Dict[str, tuple] = {}
+
+    def register(self, session_id, info):
+        self._active[session_id] = {"session_id": session_id, **info}
+
+    def unregister(self, session_id):
+        self._active.pop(session_id, None)
+
+    def save(self, session_id, snapshot):
+        now = time.time()
+        self._snapshots[session_id] = (now, snapshot)
+        # Drop snapshots nobody came back for, as the SQLite store does
+        expired = [key for key, (saved_at, _) in self._snapshots.items() if now - saved_at > self.ttl]
+        for key in expired:
+            del self._snapshots[key]
+
+    def load(self, session_id):
+        entry = self._snapshots.get(session_id)
+        if entry is None or time.time() - entry[0] > self.ttl:
+            self._snapshots.pop(session_id, None)
+            return None
+        return entry[1]
+
+    def active_sessions(self):
+        return list(self._active.values())
+
+class SQLiteSessionStore(SessionStore):
+    """Store shared by every worker on a host through one SQLite file (WAL mode)."""
+
+    def __init__(self, path: str, ttl: float = config.session_resume_ttl):
+        self.path = path
+        self.ttl = ttl
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS active_sessions (session_id TEXT PRIMARY KEY, info TEXT NOT NULL)")
+            conn.execute("CREATE TABLE IF NOT EXISTS snapshots (session_id TEXT PRIMARY KEY, saved_at REAL NOT NULL, data TEXT NOT NULL)")
+
+    def _connect(self) -> sqlite3.Connection:
+        # sqlite3 connections are not shareable across threads; keep one per thread
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def register(self, session_id, info):
+        self._connect().execute(
+            "INSERT OR REPLACE INTO active_sessions (session_id, info) VALUES (?, ?)",
+            (session_id, json.dumps({"session_id": session_id, **info})),
+        )
+
+    def unregister(self, session_id):
+        self._connect().execute("DELETE FROM active_sessions WHERE session_id = ?", (session_id,))
+
+    def save(self, session_id, snapshot):
+        conn = self._connect()
+        now = time.time()
+        conn.execute(
+            "INSERT OR REPLACE INTO snapshots (session_id, saved_at, data) VALUES (?, ?, ?)",
+            (session_id, now, json.dumps(snapshot)),
+        )
+        conn.execute("DELETE FROM snapshots WHERE saved_at < ?", (now - self.ttl,))
+
+    def load(self, session_id):
+        row = self._connect().execute(
+            "SELECT data FROM snapshots WHERE session_id = ? AND saved_at >= ?",
+            (session_id, time.time() - self.ttl),
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def active_sessions(self):
+        rows = self._connect().execute("SELECT info FROM active_sessions").fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+def snapshot_session(session: Dict[str, Any]) -> Callable[[], Dict[str, Any]]:
+    """What a resumed session needs, as a callable that builds its JSON-serializable form.
+
+    Only the conversation is kept: the client sends its current projects and tasks in
+    every handshake. ``owner`` is the hashed auth token; only the same user may resume
+    the session. The history is copied here, on the event loop, and serialized when the
+    callable runs.
+    """
+    owner = data_sync.user_key(session["auth_token"])
+    conversation = session["conversation"].snapshot()
+    return lambda: {"owner": owner, "conversation": conversation()}
+
+async def save_session(session_id: str, session: Dict[str, Any]) -> None:
+    """Store a live session's snapshot, serializing it off the event loop."""
+    snapshot = snapshot_session(session)
+    await asyncio.to_thread(lambda: session_store.save(session_id, snapshot()))
+
+def restore_conversation(snapshot: Dict[str, Any]):
+    # Imported here: conversation_memory pulls in langchain_core, which the warm-up loads off the loop
+    from conversation_memory import ConversationMemory
+    return ConversationMemory.from_dict(snapshot.get("conversation", {}))
+
+def create_session_store(url: str = config.session_store_url) -> SessionStore:
+    """Build the configured store: "memory" or "sqlite:///path/to/sessions.db"."""
+    if url.startswith("sqlite:///"):
+        return SQLiteSessionStore(url[len("sqlite:///"):])
+    if url != "memory":
+        raise ValueError(f"Unsupported SESSION_STORE: {url}")
+    return InMemorySessionStore()
+
+session_store = create_session_store()
+worker_id = os.getpid()
@@ -0,0 +1,152 @@
+import math
+import re
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+STOPWORDS = {
+    "a", "an", "and", "the", "to", "of", "in", "on", "for", "my", "me", "is", "it",
+    "at", "with", "what", "do", "i", "you", "please", "task", "tasks",
+}
+
+# BM25 parameters
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+def tokenize(text: str) -> List[str]:
+    return [t for t in TOKEN_PATTERN.findall(text.lower()) if t not in STOPWORDS]
+
+class TaskRecord:
+    """Compact view of a task dict with the fields we index on."""
+    __slots__ = ("key", "content", "project_id", "due_date", "data", "terms")
+
+    def __init__(self, key: str, data: Dict[str, Any]):
+        self.key = key
+        self.content = str(data.get("content", "Unknown"))
+        self.project_id = data.get("project_id")
+        self.due_date = data.get("due_date")
+        self.data = data
+        self.terms = tokenize(f"{self.content} {data.get('description') or ''}")
+
+class TaskStore:
+    """Per-session task store with id, project and due-date indexes.
+
+    Every mutation bumps ``version`` so derived data (such as the prompt
+    summary) is only rebuilt when the store actually changed.
+    """
+
+    def __init__(self, tasks: Optional[Iterable[Dict[str, Any]]] = None):
+        self._records: Dict[str, TaskRecord] = {}
+        self._by_project: Dict[Any, Set[str]] = {}
+        self._by_due_date: Dict[str, Set[str]] = {}
+        # Inverted index for lexical search: term -> {key: term frequency}
+        self._postings: Dict[str, Dict[str, int]] = {}
+        self._total_terms = 0
+        self._next_local = 0
+        self.version = 0
+        self._summary: Optional[str] = None
+        self._summary_version = -1
+        for task in tasks or []:
+            self.upsert(task)
+
+    def _key_for(self, task: Dict[str, Any], key: Any = None) -> str:
+        key = task.get("id", key)
+        if key is None:
+            # Tasks sent by the client without an id still need a stable key
+            self._next_local += 1
+            return f"local-{self._next_local}"
+        return str(key)
+
+    def _unindex(self, record: TaskRecord) -> None:
+        self._by_project.get(record.project_id, set()).discard(record.key)
+        if record.due_date:
+            self._by_due_date.get(str(record.due_date)[:10], set()).discard(record.key)
+        for term in set(record.terms):
+            postings = self._postings.get(term)
+            if postings is not None:
+                postings.pop(record.key, None)
+                if not postings:
+                    del self._postings[term]
+        self._total_terms -= len(record.terms)
+
+    def _index(self, record: TaskRecord) -> None:
+        self._by_project.setdefault(record.project_id, set()).add(record.key)
+        if record.due_date:
+            self._by_due_date.setdefault(str(record.due_date)[:10], set()).add(record.key)
+        for term in record.terms:
+            postings = self._postings.setdefault(term, {})
+            postings[record.key] = postings.get(record.key, 0) + 1
+        self._total_terms += len(record.terms)
+
+    def upsert(self, task: Dict[str, Any], key: Any = None) -> TaskRecord:
+        """Insert or replace a task; ``key`` is used when the task has no id."""
+        record = TaskRecord(self._key_for(task, key), task)
+        previous = self._records.get(record.key)
+        if previous is not None:
+            self._unindex(previous)
+        self._records[record.key] = record
+        self._index(record)
+        # Appends extend a current summary in place; replacements force a rebuild
+        summary_current = self._summary_version == self.version
+        self.version += 1
+        if previous is None and summary_current:
+            self._summary = f"{self._summary}, {record.content}" if self._summary else record.content
+            self._summary_version = self.version
+        return record
+
+    def remove(self, key: Any) -> Optional[Dict[str, Any]]:
+        record = self._records.pop(str(key), None)
+        if record is None:
+            return None
+        self._unindex(record)
+        self.version += 1
+        return record.data
+
+    def get(self, key: Any) -> Optional[Dict[str, Any]]:
+        record = self._records.get(str(key))
+        return record.data if record else None
+
+    def by_project(self, project_id: Any) -> List[Dict[str, Any]]:
+        return [self._records[k].data for k in self._by_project.get(project_id, ())]
+
+    def by_due_date(self, due_date: str) -> List[Dict[str, Any]]:
+        """Tasks due on a given day (YYYY-MM-DD)."""
+        return [self._records[k].data for k in self._by_due_date.get(due_date[:10], ())]
+
+    def search(self, query: str, limit: int) -> List[TaskRecord]:
+        """Return up to ``limit`` tasks ranked by BM25 relevance to ``query``."""
+        terms = set(tokenize(query))
+        if not terms or not self._records:
+            return []
+        count = len(self._records)
+        avg_len = self._total_terms / count if count else 0.0
+        scores: Dict[str, float] = {}
+        for term in terms:
+            postings = self._postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+            for key, tf in postings.items():
+                length = len(self._records[key].terms)
+                norm = tf + BM25_K1 * (1 - BM25_B + BM25_B * length / avg_len) if avg_len else tf + BM25_K1
+                scores[key] = scores.get(key, 0.0) + idf * tf * (BM25_K1 + 1) / norm
+        ranked = sorted(scores, key=scores.get, reverse=True)[:limit]
+        return [self._records[key] for key in ranked]
+
+    def records(self) -> Iterator[TaskRecord]:
+        return iter(self._records.values())
+
+    def to_list(self) -> List[Dict[str, Any]]:
+        return [record.data for record in self._records.values()]
+
+    def prompt_summary(self) -> str:
+        """Comma-separated task contents, cached until the store changes."""
+        if self._summary_version != self.version:
+            self._summary = ", ".join(record.content for record in self._records.values())
+            self._summary_version = self.version
+        return self._summary
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        return (record.data for record in self._records.values())
@@ -0,0 +1,9 @@
+import os
+import sys
+from pathlib import Path
+
+# The service modules live at the repository root, and config.py refuses to import without API keys
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+os.environ.setdefault("OPENAI_API_KEY", "test")
+os.environ.setdefault("ASSEMBLYAI_API_KEY", "test")
@@ -0,0 +1,105 @@
+"""In-process stand-ins for the model, the task backend and the client WebSocket."""
+import asyncio
+import json
+import random
+import uuid
+from types import SimpleNamespace
+from typing import Any, Dict, List
+
+from fastapi.websockets import WebSocketState
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+from conversation_memory import ConversationMemory
+from task_store import TaskStore
+
+async def jitter():
+    await asyncio.sleep(random.uniform(0, 0.005))
+
+def tool_call(name: str, /, **args) -> Dict[str, Any]:
+    return {"name": name, "args": args, "id": f"call_{uuid.uuid4().hex[:12]}"}
+
+class ScriptedModel(BaseChatModel):
+    """'Add a, b and c' creates one task per item; other requests read the task list and recite it."""
+
+    calls: int = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return "scripted"
+
+    def _reply(self, messages) -> AIMessage:
+        last = messages[-1]
+        if isinstance(last, ToolMessage):
+            tasks = json.loads(last.content).get("tasks", [])
+            return AIMessage(content="You have " + ", ".join(t["content"] for t in tasks) + ".")
+        if last.content.lower().startswith("add "):
+            names = [n.strip() for n in last.content[4:].replace(" and ", ", ").split(",") if n.strip()]
+            return AIMessage(content="", tool_calls=[
+                tool_call("create_task", content=name, description="", priority=1, project_id=1) for name in names
+            ])
+        return AIMessage(content="", tool_calls=[tool_call("get_current_tasks")])
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        self.calls += 1
+        return ChatResult(generations=[ChatGeneration(message=self._reply(messages))])
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        self.calls += 1
+        await jitter()
+        reply = self._reply(messages)
+        if reply.tool_calls:
+            yield ChatGenerationChunk(message=AIMessageChunk(content="", tool_call_chunks=[
+                {"name": call["name"], "args": json.dumps(call["args"]), "id": call["id"], "index": index}
+                for index, call in enumerate(reply.tool_calls)
+            ]))
+            return
+        for word in reply.content.split(" "):
+            await jitter()
+            yield ChatGenerationChunk(message=AIMessageChunk(content=word + " "))
+
+class RecordingBackend:
+    """Task backend stand-in that records which auth token each write carried."""
+
+    def __init__(self):
+        self.writes: List[Dict[str, Any]] = []
+        self._next_id = 10000
+
+    async def _write(self, method: str, path: str, auth_token: str, json: Dict[str, Any]):
+        await jitter()
+        self.writes.append({"method": method, "path": path, "auth_token": auth_token, "payload": json})
+        self._next_id += 1
+        task_id = self._next_id if method == "POST" else path.rsplit("/", 1)[-1]
+        return SimpleNamespace(status_code=200, json=lambda: {"id": task_id, **json})
+
+    async def post(self, path: str, auth_token: str, json: Dict[str, Any]):
+        return await self._write("POST", path, auth_token, json)
+
+    async def put(self, path: str, auth_token: str, json: Dict[str, Any]):
+        return await self._write("PUT", path, auth_token, json)
+
+    async def request(self, method: str, path: str, auth_token: str, json: Dict[str, Any], max_retries=None):
+        return await self._write(method, path, auth_token, json)
+
+class RecordingWebSocket:
+    def __init__(self):
+        self.client_state = WebSocketState.CONNECTED
+        self.state = SimpleNamespace()
+        self.frames: List[Dict[str, Any]] = []
+
+    async def send(self, message: Dict[str, Any]) -> None:
+        self.frames.append(json.loads(message["text"]))
+
+    def spoken(self) -> str:
+        return "".join(f["text"] for f in self.frames if f["type"] == "chunk")
+
+def new_session(number: int, tasks: int = 5) -> Dict[str, Any]:
+    return {
+        "auth_token": f"token-{number}",
+        "projects": ["Inbox"],
+        "tasks": TaskStore([{"id": f"{number}-{j}", "content": f"s{number}-task-{j}", "project_id": 1} for j in range(tasks)]),
+        "conversation": ConversationMemory(),
+        "sync_doc": None,
+        "sync_version": None,
+    }
@@ -0,0 +1,78 @@
+"""Trimming the conversation window to its token budget."""
+import asyncio
+
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+import pytest
+
+from fakes import tool_call
+import config
+from conversation_memory import ConversationMemory, count_tokens
+
+@pytest.fixture(autouse=True)
+def extractive(monkeypatch):
+    monkeypatch.setattr(config, "conversation_summary_mode", "extractive")
+
+def turn(number: int):
+    """A question, a tool call with its result, and the spoken answer."""
+    call = tool_call("get_current_tasks")
+    return [
+        HumanMessage(content=f"question {number}"),
+        AIMessage(content="", tool_calls=[call]),
+        ToolMessage(content='{"tasks": []}', tool_call_id=call["id"], name="get_current_tasks"),
+        AIMessage(content=f"answer {number}"),
+    ]
+
+def budget_for(*turns) -> int:
+    return sum(count_tokens(m) for t in turns for m in t)
+
+def test_whole_turns_are_evicted_oldest_first():
+    turns = [turn(n) for n in range(5)]
+    memory = ConversationMemory(token_budget=budget_for(*turns[-2:]))
+    for messages in turns:
+        memory.extend(messages)
+    assert memory.messages == turns[3] + turns[4]
+    assert memory.total_tokens == budget_for(*turns[-2:])
+
+def test_tool_calls_stay_with_their_results():
+    turns = [turn(n) for n in range(5)]
+    # Room for a turn and a half: the partial turn must go entirely, not just its first messages
+    memory = ConversationMemory(token_budget=budget_for(turns[0]) * 3 // 2)
+    for messages in turns:
+        memory.extend(messages)
+    kept = memory.messages
+    assert isinstance(kept[0], HumanMessage)
+    call_ids = {call["id"] for m in kept if isinstance(m, AIMessage) for call in m.tool_calls}
+    assert all(m.tool_call_id in call_ids for m in kept if isinstance(m, ToolMessage))
+
+def test_latest_turn_is_kept_even_over_budget():
+    memory = ConversationMemory(token_budget=1)
+    first = turn(0)
+    memory.extend(first)
+    assert memory.messages == first
+    latest = turn(1)
+    memory.extend(latest)
+    assert memory.messages == latest
+
+def test_evicted_turns_are_summarized_inline_without_a_loop():
+    memory = ConversationMemory(token_budget=1)
+    memory.extend(turn(0))
+    memory.extend(turn(1))
+    assert memory.summary == "User: question 0 Jarvis: answer 0"
+
+def test_evicted_turns_are_summarized_in_the_background():
+    async def run():
+        memory = ConversationMemory(token_budget=1)
+        for number in range(3):
+            memory.extend(turn(number))
+        await memory._summarizing
+        return memory
+
+    memory = asyncio.run(run())
+    assert memory.summary == "User: question 0 Jarvis: answer 0 User: question 1 Jarvis: answer 1"
+    assert memory.messages[0].content == "question 2"
+
+def test_summary_keeps_the_most_recent_text():
+    memory = ConversationMemory(token_budget=1, summary_tokens=5)
+    memory.extend(turn(0))
+    memory.extend(turn(1))
+    assert memory.summary == "User: question 0 Jarvis: answer 0"[-20:]
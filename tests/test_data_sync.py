@@ -0,0 +1,149 @@
+"""Client data sync: handshake versions, mid-session patches and snapshots."""
+import asyncio
+import json
+
+from fastapi.websockets import WebSocketState
+import pytest
+
+from fakes import RecordingWebSocket
+import data_sync
+from task_store import TaskStore
+import warmup
+import websocket_handler
+
+class SpyTaskStore(TaskStore):
+    """TaskStore that records which keys were written or removed."""
+
+    def __init__(self, tasks):
+        self.changes = []
+        super().__init__(tasks)
+        self.changes.clear()
+
+    def upsert(self, task, key=None):
+        self.changes.append(("upsert", str(task.get("id") if key is None else key)))
+        return super().upsert(task, key=key)
+
+    def remove(self, key):
+        self.changes.append(("remove", str(key)))
+        return super().remove(key)
+
+def new_session(tasks):
+    doc = {"projects": ["Inbox"], "tasks": tasks}
+    return {"projects": list(doc["projects"]), "tasks": SpyTaskStore(tasks), "sync_doc": doc, "sync_version": "1"}
+
+def patch(base, *ops, version="2"):
+    return {"type": "patch", "baseVersion": base, "version": version, "ops": list(ops)}
+
+TASKS = [{"id": 1, "content": "milk"}, {"id": 2, "content": "eggs"}, {"id": 3, "content": "bread"}]
+
+def test_patch_touches_only_the_tasks_it_changes():
+    session = new_session(TASKS)
+    projects = session["projects"]
+    version = data_sync.apply_message("user-a", session, patch(
+        "1",
+        {"op": "replace", "path": "/tasks/0/content", "value": "oat milk"},
+        {"op": "remove", "path": "/tasks/1"},
+        {"op": "add", "path": "/tasks/-", "value": {"id": 4, "content": "butter"}},
+        {"op": "add", "path": "/projects/-", "value": "Groceries"},
+    ))
+    assert version == "2" and session["sync_version"] == "2"
+    assert sorted(session["tasks"].changes) == [("remove", "2"), ("upsert", "1"), ("upsert", "4")]
+    assert [t["content"] for t in session["tasks"].to_list()] == ["oat milk", "bread", "butter"]
+    # Tools hold the projects list itself, so it is updated in place
+    assert session["projects"] is projects and projects == ["Inbox", "Groceries"]
+    assert data_sync.snapshot_cache.get("user-a", "2") == session["sync_doc"]
+
+def test_tasks_without_ids_rebuild_the_store():
+    session = new_session([{"content": "milk"}])
+    data_sync.apply_message("user-b", session, patch("1", {"op": "add", "path": "/tasks/-", "value": {"content": "eggs"}}))
+    assert not isinstance(session["tasks"], SpyTaskStore)
+    assert [t["content"] for t in session["tasks"].to_list()] == ["milk", "eggs"]
+
+def test_patch_against_another_version_is_a_conflict():
+    session = new_session(TASKS)
+    with pytest.raises(data_sync.SyncConflict):
+        data_sync.apply_message("user-c", session, patch("0", {"op": "remove", "path": "/tasks/0"}))
+    assert session["sync_version"] == "1" and session["tasks"].changes == []
+
+def test_patch_that_does_not_apply_is_a_conflict():
+    session = new_session(TASKS)
+    with pytest.raises(data_sync.SyncConflict):
+        data_sync.apply_message("user-d", session, patch("1", {"op": "remove", "path": "/tasks/9"}))
+    with pytest.raises(data_sync.SyncConflict):
+        data_sync.apply_message("user-d", session, patch("1", {"op": "test", "path": "/tasks/0/content", "value": "eggs"}))
+    assert session["sync_version"] == "1" and session["tasks"].changes == []
+    assert len(session["sync_doc"]["tasks"]) == 3
+
+def test_snapshot_replaces_the_document_and_versions_it_by_content():
+    session = new_session(TASKS)
+    tasks = [{"id": 2, "content": "eggs"}]
+    version = data_sync.apply_message("user-e", session, {"type": "snapshot", "projects": [], "tasks": tasks})
+    assert version == data_sync.content_version({"projects": [], "tasks": tasks})
+    assert sorted(session["tasks"].changes) == [("remove", "1"), ("remove", "3")]
+
+def test_handshake_uses_the_cached_snapshot_for_a_known_version():
+    first = data_sync.resolve_handshake("user-f", {"dataVersion": "7", "projects": ["Inbox"], "tasks": TASKS})
+    assert first == ("7", {"projects": ["Inbox"], "tasks": TASKS})
+    assert data_sync.resolve_handshake("user-f", {"dataVersion": "7"}) == first
+    assert data_sync.resolve_handshake("user-f", {"dataVersion": "8"}) == ("8", None)
+    assert data_sync.resolve_handshake("user-g", {"dataVersion": "7"}) == ("7", None)
+
+class HandshakeWebSocket(RecordingWebSocket):
+    """Client that sends a handshake, then whatever ``incoming`` holds when asked to receive."""
+
+    def __init__(self, handshake, incoming):
+        super().__init__()
+        self.handshake = json.dumps(handshake)
+        self.incoming = list(incoming)
+        self.closed = None
+
+    async def accept(self):
+        pass
+
+    async def receive_text(self):
+        return self.handshake
+
+    async def receive(self):
+        return self.incoming.pop(0)
+
+    async def close(self, code=1000, reason=None):
+        self.closed = code
+        self.client_state = WebSocketState.DISCONNECTED
+
+def run_handshake(monkeypatch, websocket):
+    # Stop right after the handshake: the agent stack "failed" to warm up
+    monkeypatch.setattr(warmup, "is_ready", lambda: False)
+
+    async def not_ready():
+        return False
+
+    monkeypatch.setattr(warmup, "wait_until_ready", not_ready)
+    asyncio.run(websocket_handler.websocket_endpoint(websocket))
+
+def test_handshake_with_an_unknown_version_asks_for_a_snapshot(monkeypatch):
+    snapshot = {"version": "v2", "projects": ["Inbox"], "tasks": TASKS}
+    websocket = HandshakeWebSocket({"authToken": "token-h", "dataVersion": "v1"}, [
+        {"type": "websocket.receive", "bytes": b"\x00\x00"},  # audio that arrived first is skipped
+        {"type": "websocket.receive", "text": json.dumps(snapshot)},
+    ])
+    run_handshake(monkeypatch, websocket)
+    assert websocket.frames == [{"type": "sync", "status": "snapshot_required", "text": "", "version": "v1"}]
+    assert websocket.incoming == []
+    assert websocket.closed == 1011  # got past the handshake
+    user = data_sync.user_key("token-h")
+    assert data_sync.snapshot_cache.get(user, "v2") == {"projects": ["Inbox"], "tasks": TASKS}
+
+def test_handshake_with_a_cached_version_needs_no_snapshot(monkeypatch):
+    data_sync.snapshot_cache.put(data_sync.user_key("token-i"), "v1", {"projects": [], "tasks": TASKS})
+    websocket = HandshakeWebSocket({"authToken": "token-i", "dataVersion": "v1"}, [])
+    run_handshake(monkeypatch, websocket)
+    assert websocket.frames == []
+    assert websocket.closed == 1011
+
+def test_disconnect_while_waiting_for_the_snapshot(monkeypatch):
+    websocket = HandshakeWebSocket({"authToken": "token-j", "dataVersion": "v1"}, [
+        {"type": "websocket.disconnect", "code": 1000},
+    ])
+    run_handshake(monkeypatch, websocket)
+    assert websocket.frames[0]["status"] == "snapshot_required"
+    assert websocket.closed == 1002
@@ -0,0 +1,85 @@
+"""Concurrency stress test: many sessions' turns and tool calls interleaved on one loop.
+
+Each session has its own auth token and task list. The model, the task
+backend and the WebSocket are in-process stand-ins, so the test needs no
+API keys or network access:
+
+    python -m pytest -q tests/test_session_isolation.py
+"""
+import asyncio
+import re
+from typing import Any, Dict, List
+
+from fakes import RecordingBackend, RecordingWebSocket, ScriptedModel, jitter, new_session
+import transcript_processor
+
+SESSIONS = 40
+TAG = re.compile(r"\bs(\d+)-")
+
+def owner_tags(text: str) -> set:
+    """Session numbers named in a piece of text (task contents look like ``s7-task-2``)."""
+    return {int(n) for n in TAG.findall(text)}
+
+async def run_session(number: int, session_memory: Dict[str, Dict[str, Any]]) -> List[RecordingWebSocket]:
+    session_id = f"session-{number}"
+    session_memory[session_id] = new_session(number)
+    turns = [
+        "What are my tasks?",               # answered by the intent router
+        f"Add s{number}-new",               # create_task through the model
+        "Which of these should I do first",  # get_current_tasks, then the model answers
+        "Which of these should I do first",  # the same answer from the response cache
+    ]
+    sockets = []
+    for transcript in turns:
+        websocket = RecordingWebSocket()
+        await transcript_processor.process_transcript_streaming(websocket, session_id, transcript, session_memory)
+        sockets.append(websocket)
+    return sockets
+
+def test_concurrent_sessions_only_see_their_own_data(monkeypatch):
+    backend = RecordingBackend()
+    monkeypatch.setattr(transcript_processor, "model", ScriptedModel())
+    monkeypatch.setattr(transcript_processor, "backend_client", backend)
+    monkeypatch.setattr(transcript_processor, "write_behind_queue", None)
+    session_memory: Dict[str, Dict[str, Any]] = {}
+
+    async def run_all():
+        return await asyncio.gather(*(run_session(n, session_memory) for n in range(SESSIONS)))
+
+    results = asyncio.run(run_all())
+
+    for number, sockets in enumerate(results):
+        for websocket in sockets:
+            assert not any(f["type"] == "error" for f in websocket.frames), websocket.frames
+            assert owner_tags(websocket.spoken()) <= {number}, websocket.spoken()
+        # The read after the write sees this session's new task, and only this session's tasks
+        listed = sockets[2].spoken()
+        assert f"s{number}-new" in listed and f"s{number}-task-0" in listed
+        assert sockets[3].spoken() == listed
+
+        tasks = session_memory[f"session-{number}"]["tasks"].to_list()
+        assert {t["content"] for t in tasks} == {f"s{number}-task-{j}" for j in range(5)} | {f"s{number}-new"}
+
+    assert len(backend.writes) == SESSIONS
+    for write in backend.writes:
+        assert owner_tags(write["payload"]["content"]) == {int(write["auth_token"].split("-")[1])}
+
+def test_concurrent_tool_calls_use_their_own_state():
+    session_memory = {f"session-{n}": new_session(n) for n in range(SESSIONS)}
+
+    async def call(number: int) -> List[str]:
+        state = {"session_id": f"session-{number}", "session_memory": session_memory, "messages": []}
+        transcript_processor.AgentStateRegistry.set_state(state)
+        seen = []
+        for _ in range(5):
+            await jitter()
+            result = await transcript_processor.tools_by_name["get_current_tasks"].ainvoke({})
+            seen.extend(t["content"] for t in result["tasks"])
+        return seen
+
+    async def run_all():
+        # Each call runs as its own task, as each session's turn does
+        return await asyncio.gather(*(asyncio.create_task(call(n)) for n in range(SESSIONS)))
+
+    for number, seen in enumerate(asyncio.run(run_all())):
+        assert owner_tags(" ".join(seen)) == {number}
@@ -0,0 +1,58 @@
+"""Turns that end on the tools' own confirmation instead of a second model call."""
+import asyncio
+
+import pytest
+
+from fakes import RecordingBackend, RecordingWebSocket, ScriptedModel, new_session
+import transcript_processor
+
+@pytest.fixture
+def model(monkeypatch):
+    model = ScriptedModel()
+    monkeypatch.setattr(transcript_processor, "model", model)
+    monkeypatch.setattr(transcript_processor, "write_behind_queue", None)
+    return model
+
+@pytest.fixture
+def backend(monkeypatch):
+    backend = RecordingBackend()
+    monkeypatch.setattr(transcript_processor, "backend_client", backend)
+    return backend
+
+def run_turn(transcript: str) -> RecordingWebSocket:
+    session_memory = {"session": new_session(1, tasks=0)}
+    websocket = RecordingWebSocket()
+    asyncio.run(transcript_processor.process_transcript_streaming(websocket, "session", transcript, session_memory))
+    return websocket
+
+def test_single_write_ends_the_turn_with_its_confirmation(model, backend):
+    websocket = run_turn("Add milk")
+    assert websocket.spoken() == "Task 'milk' added successfully!"
+    assert model.calls == 1
+
+def test_several_writes_are_confirmed_together(model, backend):
+    websocket = run_turn("Add milk, eggs and bread")
+    assert sorted(w["payload"]["content"] for w in backend.writes) == ["bread", "eggs", "milk"]
+    assert websocket.spoken() == "3 tasks added successfully: milk, eggs, bread."
+    assert model.calls == 1
+
+def test_a_failed_write_goes_back_to_the_model(model, monkeypatch):
+    class FailingBackend(RecordingBackend):
+        async def post(self, path, auth_token, json):
+            response = await super().post(path, auth_token, json)
+            if json["content"] == "eggs":
+                response.status_code = 500
+            return response
+
+    monkeypatch.setattr(transcript_processor, "backend_client", FailingBackend())
+    run_turn("Add milk, eggs and bread")
+    assert model.calls == 2
+
+def test_describe_tool_batch_mixes_creates_and_updates():
+    calls = [
+        {"name": "create_tasks_bulk", "args": {"tasks": [{"content": "milk"}, {"content": "eggs"}]}},
+        {"name": "update_task", "args": {"id": "7", "content": "bread"}},
+    ]
+    assert transcript_processor.describe_tool_batch(calls) == (
+        "2 tasks added successfully: milk, eggs. 1 task updated successfully: bread."
+    )
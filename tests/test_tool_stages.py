@@ -0,0 +1,75 @@
+"""How one model response's tool calls are ordered and parallelized."""
+import asyncio
+
+from langchain_core.messages import AIMessage
+
+from fakes import tool_call
+import transcript_processor
+from transcript_processor import plan_tool_stages, update_targets
+
+def test_create_project_runs_before_task_writes():
+    calls = [
+        tool_call("create_project", name="Groceries"),
+        tool_call("create_task", content="milk"),
+        tool_call("update_task", id="7", content="bread"),
+    ]
+    assert plan_tool_stages(calls) == [[0], [1, 2]]
+
+def test_writes_run_before_the_task_list_is_read():
+    calls = [
+        tool_call("create_task", content="milk"),
+        tool_call("update_tasks_bulk", tasks=[{"id": "7", "content": "bread"}]),
+        tool_call("get_current_tasks"),
+    ]
+    assert plan_tool_stages(calls) == [[0, 1], [2]]
+
+def test_updates_to_the_same_task_stay_in_order():
+    calls = [
+        tool_call("update_task", id="7", content="bread"),
+        tool_call("update_tasks_bulk", tasks=[{"id": 7, "priority": 4}, {"id": "8", "priority": 1}]),
+        tool_call("update_task", id="8", content="butter"),
+    ]
+    assert plan_tool_stages(calls) == [[0], [1], [2]]
+
+def test_unrelated_calls_share_a_stage():
+    calls = [
+        tool_call("update_task", id="7", content="bread"),
+        tool_call("update_task", id="8", content="butter"),
+        tool_call("create_task", content="milk"),
+        tool_call("get_current_projects"),
+    ]
+    assert plan_tool_stages(calls) == [[0, 1, 2, 3]]
+
+def test_update_targets():
+    assert update_targets(tool_call("update_task", id=7)) == {"7"}
+    assert update_targets(tool_call("update_tasks_bulk", tasks=[{"id": "7"}, {"content": "no id"}, "junk"])) == {"7"}
+    assert update_targets(tool_call("create_task", content="milk")) == set()
+
+class SlowTool:
+    """Tool stand-in that records when each call starts and finishes after a given delay."""
+
+    def __init__(self, log):
+        self.log = log
+
+    async def ainvoke(self, args):
+        self.log.append(("start", args["label"]))
+        await asyncio.sleep(args["delay"])
+        self.log.append(("end", args["label"]))
+        return {"status": "success", "label": args["label"]}
+
+def test_tool_messages_follow_the_model_call_order(monkeypatch):
+    log = []
+    tool = SlowTool(log)
+    monkeypatch.setattr(transcript_processor, "tools_by_name", {"update_task": tool, "get_current_tasks": tool})
+    calls = [
+        tool_call("update_task", id="7", label="slow", delay=0.05),
+        tool_call("update_task", id="8", label="fast", delay=0),
+        tool_call("get_current_tasks", label="read", delay=0),
+    ]
+    state = {"messages": [AIMessage(content="", tool_calls=calls)]}
+
+    state = asyncio.run(transcript_processor.custom_tool_node(state))
+
+    # The two updates ran side by side, and the read waited for both
+    assert log == [("start", "slow"), ("start", "fast"), ("end", "fast"), ("end", "slow"), ("start", "read"), ("end", "read")]
+    assert [m.tool_call_id for m in state["messages"][1:]] == [call["id"] for call in calls]
@@ -0,0 +1,171 @@
+"""The write-behind journal against a throwaway SQLite file and an in-process backend."""
+import asyncio
+
+import httpx
+import pytest
+
+from fakes import RecordingBackend, new_session
+import config
+import write_behind
+
+class FlakyBackend(RecordingBackend):
+    """Answers with the queued failures first (a status code or an exception), then succeeds."""
+
+    def __init__(self, *failures):
+        super().__init__()
+        self.failures = list(failures)
+        self.attempts = []
+
+    async def request(self, method, path, auth_token, json, max_retries=None):
+        self.attempts.append((method, path))
+        if self.failures:
+            failure = self.failures.pop(0)
+            if isinstance(failure, Exception):
+                raise failure
+            response = await super().request(method, path, auth_token, json)
+            response.status_code = failure
+            return response
+        return await super().request(method, path, auth_token, json)
+
+@pytest.fixture
+def journal(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "backend_retry_backoff", 0)
+    return str(tmp_path / "write_behind.db")
+
+@pytest.fixture
+def backend(monkeypatch):
+    backend = RecordingBackend()
+    monkeypatch.setattr(write_behind, "backend_client", backend)
+    return backend
+
+async def drained(queue: write_behind.WriteBehindQueue) -> None:
+    while queue._workers:
+        await asyncio.sleep(0.01)
+
+def open_session(queue, session_id="session", number=1):
+    session = new_session(number, tasks=0)
+    corrections = []
+
+    async def notify(frame):
+        corrections.append(frame)
+
+    queue.register_session(session_id, session, notify)
+    return session, corrections
+
+def test_created_task_takes_its_server_id(journal, backend):
+    async def run():
+        queue = write_behind.WriteBehindQueue(journal)
+        session, _ = open_session(queue)
+        result = queue.create_task("session", session, {"content": "milk"})
+        assert result["task_id"].startswith("local-") and session["tasks"].get(result["task_id"])
+        await drained(queue)
+        return queue, session, result["task_id"]
+
+    queue, session, local_id = asyncio.run(run())
+    assert [t["id"] for t in session["tasks"].to_list()] == [10001]
+    assert queue._resolve(local_id) == ("10001", False)
+    assert queue.pending() == 0
+
+def test_update_addressed_to_a_local_id_uses_the_server_id(journal, backend):
+    async def run():
+        queue = write_behind.WriteBehindQueue(journal)
+        session, _ = open_session(queue)
+        local_id = queue.create_task("session", session, {"content": "milk"})["task_id"]
+        queue.update_task("session", session, local_id, {"content": "oat milk"})
+        await drained(queue)
+        return session
+
+    session = asyncio.run(run())
+    assert [(w["method"], w["path"]) for w in backend.writes] == [("POST", "/todo/tasks/"), ("PUT", "/todo/tasks/10001")]
+    assert [t["content"] for t in session["tasks"].to_list()] == ["oat milk"]
+
+def test_failed_create_is_rolled_back_with_a_correction(journal, monkeypatch):
+    backend = FlakyBackend(500)
+    monkeypatch.setattr(write_behind, "backend_client", backend)
+
+    async def run():
+        queue = write_behind.WriteBehindQueue(journal)
+        session, corrections = open_session(queue)
+        local_id = queue.create_task("session", session, {"content": "milk"})["task_id"]
+        await drained(queue)
+        return queue, session, corrections, local_id
+
+    queue, session, corrections, local_id = asyncio.run(run())
+    assert session["tasks"].to_list() == []
+    assert corrections == [{
+        "type": "correction",
+        "text": "Sorry, I couldn't save the task 'milk' (HTTP 500), so I've removed it.",
+        "task_id": local_id,
+    }]
+    assert backend.attempts == [("POST", "/todo/tasks/")]  # a POST that may have landed is not resent
+    assert "error" in queue.update_task("session", session, local_id, {"content": "oat milk"})
+
+def test_failed_update_restores_the_previous_task(journal, monkeypatch):
+    backend = FlakyBackend(*[503] * config.write_behind_max_attempts)
+    monkeypatch.setattr(write_behind, "backend_client", backend)
+
+    async def run():
+        queue = write_behind.WriteBehindQueue(journal)
+        session, corrections = open_session(queue)
+        session["tasks"].upsert({"id": "7", "content": "milk"})
+        queue.update_task("session", session, "7", {"content": "oat milk"})
+        await drained(queue)
+        return session, corrections
+
+    session, corrections = asyncio.run(run())
+    assert session["tasks"].get("7")["content"] == "milk"
+    assert corrections[0]["type"] == "correction" and corrections[0]["task_id"] == "7"
+    assert len(backend.attempts) == config.write_behind_max_attempts  # a PUT is safe to repeat
+
+def test_post_is_resent_only_when_it_never_reached_the_server(journal, monkeypatch):
+    request = httpx.Request("POST", "http://backend/todo/tasks/")
+    backend = FlakyBackend(httpx.ConnectError("refused", request=request), httpx.ReadError("reset", request=request))
+    monkeypatch.setattr(write_behind, "backend_client", backend)
+
+    async def run():
+        queue = write_behind.WriteBehindQueue(journal)
+        session, corrections = open_session(queue)
+        queue.create_task("session", session, {"content": "milk"})
+        await drained(queue)
+        return corrections
+
+    corrections = asyncio.run(run())
+    assert len(backend.attempts) == 2
+    assert "reset" in corrections[0]["text"]
+
+def test_writes_resume_when_their_user_reconnects_after_a_restart(journal, backend):
+    async def before_restart():
+        queue = write_behind.WriteBehindQueue(journal)
+        session, _ = open_session(queue)
+        queue.create_task("session", session, {"content": "milk"})
+        await queue.stop()  # the worker never got to send it
+        return queue.pending()
+
+    async def after_restart():
+        queue = write_behind.WriteBehindQueue(journal)
+        queue.resume_pending()
+        await asyncio.sleep(0.05)
+        unsent = len(backend.writes)  # no token for the user yet
+        open_session(queue, session_id="session")
+        await drained(queue)
+        return unsent, queue.pending()
+
+    assert asyncio.run(before_restart()) == 1
+    assert asyncio.run(after_restart()) == (0, 0)
+    assert [w["payload"]["content"] for w in backend.writes] == ["milk"]
+    assert backend.writes[0]["auth_token"] == "token-1"
+
+def test_workers_sharing_a_journal_send_each_write_once_in_order(journal, backend):
+    async def run():
+        first = write_behind.WriteBehindQueue(journal, worker=1)
+        second = write_behind.WriteBehindQueue(journal, worker=2)
+        session, _ = open_session(first)
+        open_session(second)
+        for n in range(20):
+            (first if n % 2 else second).create_task("session", session, {"content": f"task-{n}"})
+        await drained(first)
+        await drained(second)
+        return first.pending()
+
+    assert asyncio.run(run()) == 0
+    assert [w["payload"]["content"] for w in backend.writes] == [f"task-{n}" for n in range(20)]
@@ -1,11 +1,35 @@
 import python_weather
 import asyncio
+from cachetools import TTLCache
+import config
+
+# Recent answers per city, and one shared client instead of a new one per call
+_weather_cache: TTLCache = TTLCache(maxsize=256, ttl=config.weather_cache_ttl)
+_client = None
+
+async def _get_client() -> python_weather.Client:
+    global _client
+    if _client is None:
+        _client = python_weather.Client()
+    return _client
+
+async def close_weather_client() -> None:
+    global _client
+    if _client is not None:
+        await _client.close()
+        _client = None
 
 async def get_weather(city: str) -> str:
+    key = city.strip().lower()
+    cached = _weather_cache.get(key)
+    if cached is not None:
+        return cached
     try:
-        async with python_weather.Client() as client:
-            weather = await client.get(city)
-            current = weather.current
-            return f"The weather in {city} is {current.temperature}°C with {current.sky_text}."
+        client = await _get_client()
+        weather = await client.get(city)
+        current = weather.current
+        result = f"The weather in {city} is {current.temperature}°C with {current.sky_text}."
+        _weather_cache[key] = result
+        return result
     except Exception as e:
         return f"Couldn't fetch weather for {city}: {str(e)}"
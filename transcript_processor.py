@@ -1,12 +1,32 @@
-import json
-from typing import TypedDict, Dict, List, Any, Optional
+import asyncio
+import logging
+import re
+import time
+from contextvars import ContextVar
+from typing import TypedDict, Dict, List, Any, Optional, Set, Tuple
 from fastapi import WebSocket
 from fastapi.websockets import WebSocketState
 from langchain_core.tools import tool
 from langchain_openai import ChatOpenAI
-from langchain_core.messages import AIMessage, ToolMessage, HumanMessage, SystemMessage
+from langchain_core.messages import AIMessage, BaseMessage, ToolMessage, HumanMessage, SystemMessage
+from langchain_core.utils.function_calling import convert_to_openai_tool
 from langgraph.graph import StateGraph, END
-from config import openai_client
+from pydantic import BaseModel
+from config import (
+    openai_api_key,
+    max_parallel_tools,
+    backend_bulk_concurrency,
+    end_turn_after_tools,
+    prompt_context_token_budget,
+    prompt_context_top_k,
+)
+from backend_client import backend_client
+from task_store import tokenize
+from intent_router import intent_router
+from response_cache import data_version, session_cache
+from write_behind import write_behind_queue
+from serialization import dumps_text, send_end, send_frame
+import metrics
 import httpx
 
 class AgentState(TypedDict):
@@ -15,6 +35,84 @@ class AgentState(TypedDict):
     response: str
     messages: List[Any]
     session_memory: Dict[str, Dict[str, Any]]
+    tools_final: bool
+    failed: bool
+
+class NewTask(BaseModel):
+    content: str
+    description: str = ""
+    priority: int = 1
+    project_id: int = 1
+    due_date: Optional[str] = None
+    reminder_at: Optional[str] = None
+
+class TaskUpdate(BaseModel):
+    id: str
+    content: str
+    description: str = ""
+    is_completed: bool = False
+    priority: int = 1
+    project_id: int = 1
+    due_date: Optional[str] = None
+    reminder_at: Optional[str] = None
+
+def _merge_update(session_data: Dict[str, Any], update: TaskUpdate) -> Dict[str, Any]:
+    """Full-replacement PUT payload: the fields the model set, over the task's current values.
+
+    Fields the model left out keep their stored value instead of falling back to
+    the TaskUpdate defaults, so "mark A and B done" doesn't reset project or priority.
+    """
+    current = session_data["tasks"].get(update.id) or {}
+    payload = update.model_dump(exclude={"id"})
+    payload.update({key: current[key] for key in payload if key in current})
+    payload.update(update.model_dump(exclude={"id"}, exclude_unset=True))
+    return payload
+
+async def _post_task(session_id: str, session_data: Dict[str, Any], payload: Dict[str, Any]) -> dict:
+    """POST one task to the backend and record it in the session."""
+    if write_behind_queue is not None:
+        return write_behind_queue.create_task(session_id, session_data, payload)
+    try:
+        response = await backend_client.post("/todo/tasks/", session_data["auth_token"], json=payload)
+        if response.status_code == 200:
+            task = response.json()
+            session_data["tasks"].upsert(task)
+            return {"status": "success", "task_id": task.get("id")}
+        return {"error": f"Task creation failed: HTTP {response.status_code}"}
+    except httpx.RequestError as e:
+        return {"error": f"Request failed: {str(e)}"}
+
+async def _put_task(session_id: str, session_data: Dict[str, Any], id: str, payload: Dict[str, Any]) -> dict:
+    """PUT one task update to the backend and record it in the session."""
+    if write_behind_queue is not None:
+        return write_behind_queue.update_task(session_id, session_data, id, payload)
+    try:
+        response = await backend_client.put(f"/todo/tasks/{id}", session_data["auth_token"], json=payload)
+        if response.status_code == 200:
+            session_data["tasks"].upsert(response.json(), key=id)
+            return {"status": "success"}
+        return {"error": f"Task update failed: HTTP {response.status_code}"}
+    except httpx.RequestError as e:
+        return {"error": f"Request failed: {str(e)}"}
+
+async def _burst(calls: List[Any]) -> List[dict]:
+    """Run backend writes as one pipelined burst over the pooled connections."""
+    semaphore = asyncio.Semaphore(backend_bulk_concurrency)
+
+    async def limited(call):
+        async with semaphore:
+            return await call
+
+    return await asyncio.gather(*(limited(call) for call in calls))
+
+def _bulk_result(items: List[Dict[str, Any]], results: List[dict]) -> dict:
+    succeeded = sum(1 for r in results if r.get("status") == "success")
+    return {
+        "status": "success" if succeeded == len(results) else "partial" if succeeded else "error",
+        "succeeded": succeeded,
+        "failed": len(results) - succeeded,
+        "results": [{**item, **result} for item, result in zip(items, results)],
+    }
 
 @tool
 async def create_task(
@@ -27,29 +125,23 @@ async def create_task(
 ) -> dict:
     """Create a new task in the task manager."""
     state = AgentStateRegistry.get_state()
-    async with httpx.AsyncClient() as client:
-        base_url = "https://jarvis.trylenoxinstruments.com"  # Using the URL from your update_task function
-        auth_token = state["session_memory"][state["session_id"]]["auth_token"]
-        try:
-            response = await client.post(
-                f"{base_url}/todo/tasks/",
-                json={
-                    "content": content,
-                    "description": description,
-                    "priority": priority,
-                    "project_id": project_id,
-                    "due_date": due_date,
-                    "reminder_at": reminder_at
-                },
-                headers={"Authorization": f"Bearer {auth_token}", "Content-Type": "application/json"}
-            )
-            if response.status_code == 200:
-                task = response.json()
-                state["session_memory"][state["session_id"]]["tasks"].append(task)
-                return {"status": "success", "task_id": task.get("id")}
-            return {"error": f"Task creation failed: HTTP {response.status_code}"}
-        except httpx.RequestError as e:
-            return {"error": f"Request failed: {str(e)}"}
+    return await _post_task(state["session_id"], state["session_memory"][state["session_id"]], {
+        "content": content,
+        "description": description,
+        "priority": priority,
+        "project_id": project_id,
+        "due_date": due_date,
+        "reminder_at": reminder_at
+    })
+
+@tool
+async def create_tasks_bulk(tasks: List[NewTask]) -> dict:
+    """Create several tasks at once. Prefer this over repeated create_task calls."""
+    state = AgentStateRegistry.get_state()
+    session_data = state["session_memory"][state["session_id"]]
+    payloads = [task.model_dump() for task in tasks]
+    results = await _burst([_post_task(state["session_id"], session_data, payload) for payload in payloads])
+    return _bulk_result([{"content": p["content"]} for p in payloads], results)
 
 @tool
 async def update_task(
@@ -64,35 +156,25 @@ async def update_task(
 ) -> dict:
     """Update an existing task."""
     state = AgentStateRegistry.get_state()
-    async with httpx.AsyncClient() as client:
-        base_url = "https://jarvis.trylenoxinstruments.com"
-        auth_token = state["session_memory"][state["session_id"]]["auth_token"]
-        try:
-            response = await client.put(
-                f"{base_url}/todo/tasks/{id}",
-                json={
-                    "content": content,
-                    "description": description,
-                    "is_completed": is_completed,
-                    "priority": priority,
-                    "project_id": project_id,
-                    "due_date": due_date,
-                    "reminder_at": reminder_at
-                },
-                headers={"Authorization": f"Bearer {auth_token}", "Content-Type": "application/json"}
-            )
-            if response.status_code == 200:
-                task = response.json()
-                tasks = state["session_memory"][state["session_id"]]["tasks"]
-                index = next((i for i, t in enumerate(tasks) if t.get("id") == id), -1)
-                if index >= 0:
-                    tasks[index] = task
-                else:
-                    tasks.append(task)
-                return {"status": "success"}
-            return {"error": f"Task update failed: HTTP {response.status_code}"}
-        except httpx.RequestError as e:
-            return {"error": f"Request failed: {str(e)}"}
+    return await _put_task(state["session_id"], state["session_memory"][state["session_id"]], id, {
+        "content": content,
+        "description": description,
+        "is_completed": is_completed,
+        "priority": priority,
+        "project_id": project_id,
+        "due_date": due_date,
+        "reminder_at": reminder_at
+    })
+
+@tool
+async def update_tasks_bulk(tasks: List[TaskUpdate]) -> dict:
+    """Update several existing tasks at once. Prefer this over repeated update_task calls."""
+    state = AgentStateRegistry.get_state()
+    session_data = state["session_memory"][state["session_id"]]
+    results = await _burst([
+        _put_task(state["session_id"], session_data, task.id, _merge_update(session_data, task)) for task in tasks
+    ])
+    return _bulk_result([{"id": task.id, "content": task.content} for task in tasks], results)
 
 @tool
 async def create_project(
@@ -103,33 +185,31 @@ async def create_project(
 ) -> dict:
     """Create a new project."""
     state = AgentStateRegistry.get_state()
-    async with httpx.AsyncClient() as client:
-        base_url = "https://jarvis.trylenoxinstruments.com"
-        auth_token = state["session_memory"][state["session_id"]]["auth_token"]
-        try:
-            response = await client.post(
-                f"{base_url}/todo/projects/",
-                json={
-                    "name": name,
-                    "color": color,
-                    "is_favorite": is_favorite,
-                    "view_style": view_style
-                },
-                headers={"Authorization": f"Bearer {auth_token}", "Content-Type": "application/json"}
-            )
-            if response.status_code == 200:
-                project = response.json()
-                state["session_memory"][state["session_id"]]["projects"].append(project.get("name", name))
-                return {"status": "success", "project_id": project.get("id", 0)}
-            return {"error": f"Project creation failed: HTTP {response.status_code}"}
-        except httpx.RequestError as e:
-            return {"error": f"Request failed: {str(e)}"}
+    auth_token = state["session_memory"][state["session_id"]]["auth_token"]
+    try:
+        response = await backend_client.post(
+            "/todo/projects/",
+            auth_token,
+            json={
+                "name": name,
+                "color": color,
+                "is_favorite": is_favorite,
+                "view_style": view_style
+            }
+        )
+        if response.status_code == 200:
+            project = response.json()
+            state["session_memory"][state["session_id"]]["projects"].append(project.get("name", name))
+            return {"status": "success", "project_id": project.get("id", 0)}
+        return {"error": f"Project creation failed: HTTP {response.status_code}"}
+    except httpx.RequestError as e:
+        return {"error": f"Request failed: {str(e)}"}
 
 @tool
 async def get_current_tasks() -> dict:
     """Retrieve the current list of tasks for the user."""
     state = AgentStateRegistry.get_state()
-    return {"status": "success", "tasks": state["session_memory"][state["session_id"]]["tasks"]}
+    return {"status": "success", "tasks": state["session_memory"][state["session_id"]]["tasks"].to_list()}
 
 @tool
 async def get_current_projects() -> dict:
@@ -137,23 +217,129 @@ async def get_current_projects() -> dict:
     state = AgentStateRegistry.get_state()
     return {"status": "success", "projects": state["session_memory"][state["session_id"]]["projects"]}
 
-# Registry to hold the current state for tool access
-class AgentStateRegistry:
-    _state: AgentState = None
+# Registry to hold the current state for tool access. Backed by a ContextVar so
+# each session's turn (its own asyncio task) only ever sees its own state.
+_current_state: ContextVar[Optional[AgentState]] = ContextVar("agent_state", default=None)
 
+class AgentStateRegistry:
     @classmethod
     def set_state(cls, state: AgentState):
-        cls._state = state
+        _current_state.set(state)
 
     @classmethod
     def get_state(cls) -> AgentState:
-        if cls._state is None:
+        state = _current_state.get()
+        if state is None:
             raise ValueError("Agent state not set")
-        return cls._state
+        return state
 
 # Define tools and model
-tools = [create_task, update_task, create_project, get_current_tasks, get_current_projects]
-model = ChatOpenAI(model="gpt-3.5-turbo", openai_api_key=openai_client.api_key).bind_tools(tools)
+tools = [create_task, create_tasks_bulk, update_task, update_tasks_bulk, create_project, get_current_tasks, get_current_projects]
+tools_by_name = {tool.name: tool for tool in tools}
+# Converted once; every request sends these exact bytes, which keeps the provider's prompt cache warm
+TOOL_SCHEMAS = [convert_to_openai_tool(t) for t in tools]
+model = ChatOpenAI(model="gpt-3.5-turbo", openai_api_key=openai_api_key, streaming=True).bind_tools(TOOL_SCHEMAS)
+
+# Static instructions; per-session data goes in a separate context message (see build_prompt)
+SYSTEM_INSTRUCTIONS = """
+You are Jarvis, a helpful assistant for a task manager app. Respond concisely in plain text suitable for text-to-speech, avoiding JSON or action details. Use function calls for actions like creating tasks, updating tasks, creating projects, or fetching current tasks/projects.
+
+The user's current projects and tasks are given in a system message just before their latest request.
+
+Rules:
+- Use create_task for new tasks, assigning to 'Inbox' (project_id=1) if no project matches.
+- Use create_tasks_bulk instead when creating more than one task in a single request.
+- Use update_task for task modifications, or update_tasks_bulk when modifying several tasks.
+- Use create_project for new projects.
+- Use get_current_tasks or get_current_projects to fetch task/project info when asked.
+- For prompts requiring multiple actions (e.g., create project and tasks), execute functions in the correct order: create project first, then tasks with the new project's ID.
+- Respond in a friendly, conversational tone.
+"""
+SYSTEM_MESSAGE = SystemMessage(content=SYSTEM_INSTRUCTIONS)
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate (~4 characters per token) for budgeting prompt context."""
+    return (len(text) + 3) // 4
+
+def select_within_budget(items: List[str], budget: int) -> List[str]:
+    selected = []
+    used = 0
+    for item in items:
+        cost = estimate_tokens(item) + 1
+        if used + cost > budget:
+            break
+        selected.append(item)
+        used += cost
+    return selected
+
+def build_context(session_data: Dict[str, Any], transcript: str) -> Tuple[str, str, bool]:
+    """Pick the projects and tasks to show the model, keeping them within the token budget.
+
+    Small lists are included in full; larger ones are narrowed to the entries most
+    relevant to the transcript, and the model is told to call get_current_tasks or
+    get_current_projects for the rest. The flag says whether the transcript was used.
+    """
+    narrowed = False
+    budget = prompt_context_token_budget
+    projects = session_data["projects"]
+    project_text = ", ".join(projects)
+    if estimate_tokens(project_text) > budget // 4:
+        words = set(tokenize(transcript))
+        ranked = sorted(projects, key=lambda p: len(words & set(tokenize(p))), reverse=True)
+        shown = select_within_budget(ranked[:prompt_context_top_k], budget // 4)
+        project_text = f"{', '.join(shown)} (showing {len(shown)} of {len(projects)}; call get_current_projects for all)"
+        narrowed = True
+
+    store = session_data["tasks"]
+    task_text = store.prompt_summary()
+    task_budget = budget - estimate_tokens(project_text)
+    if estimate_tokens(task_text) > task_budget:
+        matches = [record.content for record in store.search(transcript, prompt_context_top_k)]
+        shown = select_within_budget(matches, task_budget)
+        task_text = f"{', '.join(shown) or 'none matching'} (showing {len(shown)} of {len(store)} most relevant; call get_current_tasks for the full list)"
+        narrowed = True
+
+    return project_text, task_text, narrowed
+
+def context_message(session_data: Dict[str, Any], transcript: str) -> SystemMessage:
+    """The per-session context message, rebuilt only when the session's data or summary changes.
+
+    When the lists had to be narrowed to the transcript, a new transcript also rebuilds it.
+    """
+    summary = session_data["conversation"].summary
+    key = (data_version(session_data), summary)
+    cached = session_data.get("prompt_context")
+    if cached is not None and cached[0] == key and (not cached[1] or cached[2] == transcript):
+        return cached[3]
+
+    project_text, task_text, narrowed = build_context(session_data, transcript)
+    content = f"Current projects: {project_text}\nCurrent tasks: {task_text}"
+    if summary:
+        content += f"\nEarlier in this conversation: {summary}"
+    message = SystemMessage(content=content)
+    session_data["prompt_context"] = (key, narrowed, transcript, message)
+    return message
+
+def build_prompt(state: AgentState) -> List[BaseMessage]:
+    """Messages for a model call, ordered so the longest possible prefix stays byte-stable.
+
+    Tool schemas and SYSTEM_MESSAGE never change, and earlier turns are only
+    appended to, so they form a prefix shared with the previous call. The
+    context message sits right before the current turn so that data changes
+    only invalidate what follows it.
+    """
+    session_data = state["session_memory"][state["session_id"]]
+    messages = state["messages"]
+    # History already ends with the current turn, starting at its HumanMessage
+    turn_start = max(len(messages) - 1, 0)
+    while turn_start > 0 and not isinstance(messages[turn_start], HumanMessage):
+        turn_start -= 1
+    return [
+        SYSTEM_MESSAGE,
+        *messages[:turn_start],
+        context_message(session_data, state["transcript"]),
+        *messages[turn_start:],
+    ]
 
 def should_continue(state: AgentState) -> str:
     """Determine if we should continue to tools or end."""
@@ -168,45 +354,20 @@ def should_continue(state: AgentState) -> str:
 async def call_model(state: AgentState) -> AgentState:
     """Call the model with the current state."""
     try:
-        # Get current session data
-        session_data = state["session_memory"][state["session_id"]]
-        
-        system_prompt = f"""
-You are Jarvis, a helpful assistant for a task manager app. Respond concisely in plain text suitable for text-to-speech, avoiding JSON or action details. Use function calls for actions like creating tasks, updating tasks, creating projects, or fetching current tasks/projects.
-
-Current projects: {', '.join(session_data['projects'])}
-Current tasks: {', '.join([str(t.get('content', 'Unknown')) for t in session_data['tasks']])}
-
-Rules:
-- Use create_task for new tasks, assigning to 'Inbox' (project_id=1) if no project matches.
-- Use update_task for task modifications.
-- Use create_project for new projects.
-- Use get_current_tasks or get_current_projects to fetch task/project info when asked.
-- For prompts requiring multiple actions (e.g., create project and tasks), execute functions in the correct order: create project first, then tasks with the new project's ID.
-- Respond in a friendly, conversational tone.
-"""
-
-        # Build messages list
-        messages = [SystemMessage(content=system_prompt)]
-        
-        # Add conversation history (excluding duplicate system messages)
-        for msg in state["messages"]:
-            if not isinstance(msg, SystemMessage):
-                messages.append(msg)
-        
-        # Add current transcript if not already in messages
-        if not any(isinstance(m, HumanMessage) and m.content == state["transcript"] for m in messages):
-            messages.append(HumanMessage(content=state["transcript"]))
+        messages = build_prompt(state)
 
         # Set state for tools
         AgentStateRegistry.set_state(state)
 
         # Get response from model
+        metrics.graph_stats["model_calls"] += 1
+        started = time.perf_counter()
         response = await model.ainvoke(messages)
-        print(f"Model response: {response}")
+        metrics.model_call_seconds.observe(time.perf_counter() - started)
+        metrics.log_sampled(logging.DEBUG, lambda: f"Model response: {response}")
 
-        # Update state with response
-        state["messages"] = messages[1:] + [response]  # Exclude system message from stored messages
+        # Update state with response (the system message is never stored)
+        state["messages"].append(response)
         state["response"] = response.content if response.content else ""
         
         return state
@@ -216,10 +377,143 @@ Rules:
         error_message = f"Sorry, I ran into an issue: {str(e)}. Please try again or ask for something else."
         state["messages"].append(AIMessage(content=error_message))
         state["response"] = error_message
+        state["failed"] = True
         return state
 
+# Tools that change the session's tasks or projects; turns using them are never cached
+WRITE_TOOLS = {"create_task", "create_tasks_bulk", "update_task", "update_tasks_bulk", "create_project"}
+READ_TOOLS = {"get_current_tasks", "get_current_projects"}
+
+# Write tools whose spoken confirmation fully answers the request on success. Reads are
+# not final: the model still has to answer the question from the fetched list (plain
+# "list my tasks" requests are answered by the intent router without the model).
+# create_project is left out because follow-up calls usually need its id.
+FINAL_TOOLS = {
+    "create_task",
+    "create_tasks_bulk",
+    "update_task",
+    "update_tasks_bulk",
+}
+
+# Tools whose effects a later call in the same batch may rely on. A call waits for
+# every earlier call in the batch whose tool name appears in its dependency set;
+# updates touching the same task id (single or bulk) are also kept in order.
+TOOL_DEPENDENCIES = {
+    "create_task": {"create_project"},
+    "create_tasks_bulk": {"create_project"},
+    "update_task": {"create_project"},
+    "update_tasks_bulk": {"create_project"},
+    "get_current_tasks": {"create_task", "create_tasks_bulk", "update_task", "update_tasks_bulk"},
+    "get_current_projects": {"create_project"},
+}
+
+def update_targets(tool_call: Dict[str, Any]) -> Set[str]:
+    """Task ids an update_task or update_tasks_bulk call writes to."""
+    args = tool_call["args"]
+    if tool_call["name"] == "update_task":
+        items = [args]
+    elif tool_call["name"] == "update_tasks_bulk":
+        items = args.get("tasks") or []
+    else:
+        return set()
+    return {str(item["id"]) for item in items if isinstance(item, dict) and item.get("id") is not None}
+
+def plan_tool_stages(tool_calls: List[Dict[str, Any]]) -> List[List[int]]:
+    """Group tool call indexes into stages; calls within a stage are independent."""
+    stages: List[List[int]] = []
+    current: List[int] = []
+    current_names = set()
+    current_updates = set()
+    for index, tool_call in enumerate(tool_calls):
+        targets = update_targets(tool_call)
+        if current_names & TOOL_DEPENDENCIES.get(tool_call["name"], set()) or targets & current_updates:
+            stages.append(current)
+            current, current_names, current_updates = [], set(), set()
+        current.append(index)
+        current_names.add(tool_call["name"])
+        current_updates |= targets
+    if current:
+        stages.append(current)
+    return stages
+
+def describe_tool_result(tool_name: str, tool_args: Dict[str, Any], result: Dict[str, Any]) -> Optional[str]:
+    """Build the spoken response for a tool result."""
+    if tool_name in ("create_tasks_bulk", "update_tasks_bulk") and "results" in result:
+        verb = "added" if tool_name == "create_tasks_bulk" else "updated"
+        total = result["succeeded"] + result["failed"]
+        if result["failed"] == 0:
+            names = [str(r.get("content", "Unknown")) for r in result["results"]]
+            return f"{total} tasks {verb} successfully: {', '.join(names)}."
+        return f"{result['succeeded']} of {total} tasks {verb}; {result['failed']} failed. Please try those again."
+    if result.get("status") == "success":
+        if tool_name == "create_project":
+            return f"Project '{tool_args.get('name', 'Unknown')}' created successfully!"
+        elif tool_name == "create_task":
+            return f"Task '{tool_args.get('content', 'Unknown')}' added successfully!"
+        elif tool_name == "update_task":
+            return f"Task updated successfully!"
+        elif tool_name == "get_current_projects":
+            projects = result.get("projects", [])
+            return f"Your current projects are: {', '.join(projects) if projects else 'none'}."
+        elif tool_name == "get_current_tasks":
+            tasks = [str(t.get("content", "Unknown")) for t in result.get("tasks", [])]
+            return f"Your current tasks are: {', '.join(tasks) if tasks else 'none'}."
+        return None
+    error_msg = result.get("error", "Unknown error")
+    return f"Sorry, I couldn't complete that action: {error_msg}. Please try again."
+
+def describe_tool_batch(tool_calls: List[Dict[str, Any]]) -> str:
+    """One spoken confirmation for several successful write calls, worded like the bulk tools'."""
+    added: List[str] = []
+    updated: List[str] = []
+    for tool_call in tool_calls:
+        args = tool_call["args"]
+        items = (args.get("tasks") or []) if tool_call["name"].endswith("_bulk") else [args]
+        names = [str(item.get("content", "Unknown")) for item in items if isinstance(item, dict)]
+        (added if tool_call["name"].startswith("create_") else updated).extend(names)
+    parts = []
+    for verb, names in (("added", added), ("updated", updated)):
+        if names:
+            parts.append(f"{len(names)} {'task' if len(names) == 1 else 'tasks'} {verb} successfully: {', '.join(names)}.")
+    return " ".join(parts)
+
+async def run_tool_call(tool_call: Dict[str, Any], semaphore: asyncio.Semaphore) -> Tuple[ToolMessage, Optional[str], bool]:
+    """Execute a single tool call and return its ToolMessage, spoken response and success flag."""
+    tool_name = tool_call["name"]
+    tool_args = tool_call["args"]
+    tool_id = tool_call["id"]
+
+    tool = tools_by_name.get(tool_name)
+    if tool is None:
+        error_message = f"Tool {tool_name} not found"
+        return (
+            ToolMessage(content=dumps_text({"error": error_message}), tool_call_id=tool_id, name=tool_name),
+            f"Sorry, I couldn't find the requested function. Please try again.",
+            False
+        )
+
+    try:
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                result = await tool.ainvoke(tool_args)
+            finally:
+                metrics.tool_call_seconds.observe(time.perf_counter() - started, tool_name)
+        return (
+            ToolMessage(content=dumps_text(result), tool_call_id=tool_id, name=tool_name),
+            describe_tool_result(tool_name, tool_args, result),
+            result.get("status") == "success"
+        )
+    except Exception as e:
+        error_message = f"Tool {tool_name} failed: {str(e)}"
+        return (
+            ToolMessage(content=dumps_text({"error": error_message}), tool_call_id=tool_id, name=tool_name),
+            f"Sorry, I couldn't {tool_name.replace('_', ' ')}: {str(e)}. Please try again.",
+            False
+        )
+
 async def custom_tool_node(state: AgentState) -> AgentState:
-    """Custom tool node to handle tool execution and append ToolMessage."""
+    """Custom tool node to execute tool calls, running independent calls concurrently."""
     if not state["messages"]:
         return state
         
@@ -228,73 +522,51 @@ async def custom_tool_node(state: AgentState) -> AgentState:
         return state
         
     tool_calls = last_message.tool_calls
-    tool_messages = []
+    results: List[Optional[Tuple[ToolMessage, Optional[str], bool]]] = [None] * len(tool_calls)
+    semaphore = asyncio.Semaphore(max_parallel_tools)
 
-    for tool_call in tool_calls:
-        tool_name = tool_call["name"]
-        tool_args = tool_call["args"]
-        tool_id = tool_call["id"]
-
-        # Find and execute the tool
-        tool_found = False
-        for tool in tools:
-            if tool.name == tool_name:  # Use .name instead of .__name__
-                tool_found = True
-                try:
-                    result = await tool.ainvoke(tool_args)
-                    tool_messages.append(ToolMessage(
-                        content=json.dumps(result),
-                        tool_call_id=tool_id,
-                        name=tool_name
-                    ))
-                    
-                    # Update response based on tool result
-                    if result.get("status") == "success":
-                        if tool_name == "create_project":
-                            state["response"] = f"Project '{tool_args.get('name', 'Unknown')}' created successfully!"
-                        elif tool_name == "create_task":
-                            state["response"] = f"Task '{tool_args.get('content', 'Unknown')}' added successfully!"
-                        elif tool_name == "update_task":
-                            state["response"] = f"Task updated successfully!"
-                        elif tool_name == "get_current_projects":
-                            projects = result.get("projects", [])
-                            state["response"] = f"Your current projects are: {', '.join(projects) if projects else 'none'}."
-                        elif tool_name == "get_current_tasks":
-                            tasks = [str(t.get("content", "Unknown")) for t in result.get("tasks", [])]
-                            state["response"] = f"Your current tasks are: {', '.join(tasks) if tasks else 'none'}."
-                    else:
-                        error_msg = result.get("error", "Unknown error")
-                        state["response"] = f"Sorry, I couldn't complete that action: {error_msg}. Please try again."
-                        
-                except Exception as e:
-                    error_message = f"Tool {tool_name} failed: {str(e)}"
-                    tool_messages.append(ToolMessage(
-                        content=json.dumps({"error": error_message}),
-                        tool_call_id=tool_id,
-                        name=tool_name
-                    ))
-                    state["response"] = f"Sorry, I couldn't {tool_name.replace('_', ' ')}: {str(e)}. Please try again."
-                break
-        
-        if not tool_found:
-            error_message = f"Tool {tool_name} not found"
-            tool_messages.append(ToolMessage(
-                content=json.dumps({"error": error_message}),
-                tool_call_id=tool_id,
-                name=tool_name
-            ))
-            state["response"] = f"Sorry, I couldn't find the requested function. Please try again."
+    # Stages run in order; calls inside a stage run concurrently
+    for stage in plan_tool_stages(tool_calls):
+        stage_results = await asyncio.gather(*(run_tool_call(tool_calls[i], semaphore) for i in stage))
+        for index, stage_result in zip(stage, stage_results):
+            results[index] = stage_result
+
+    # Assemble messages in the model's original call order; the last call's response wins
+    tool_messages = []
+    all_succeeded = True
+    for tool_message, response, ok in results:
+        tool_messages.append(tool_message)
+        all_succeeded = all_succeeded and ok
+        if response is not None:
+            state["response"] = response
+
+    # The crafted response can end the turn when every call succeeded and none of them
+    # produces something (like a new project id) that a follow-up call may need
+    state["tools_final"] = all_succeeded and all(call["name"] in FINAL_TOOLS for call in tool_calls)
+    if state["tools_final"] and len(tool_calls) > 1:
+        # Several writes ("add milk, eggs and bread"): confirm all of them, not just the last
+        state["response"] = describe_tool_batch(tool_calls)
+    if not all_succeeded:
+        state["failed"] = True
 
     # Add tool messages to state
     state["messages"].extend(tool_messages)
     return state
 
-# Build the graph
-def build_graph():
+def after_tools(state: AgentState) -> str:
+    """End the turn with the tool-crafted response when it is final, otherwise ask the model again."""
+    if state.get("tools_final") and state.get("response"):
+        metrics.graph_stats["model_calls_saved"] += 1
+        return "end"
+    return "agent"
+
+# Build the graph. With end_after_tools=False every tool run loops back to the model.
+def build_graph(end_after_tools: bool = end_turn_after_tools, entry: str = "agent"):
     graph = StateGraph(AgentState)
     graph.add_node("agent", call_model)
     graph.add_node("tools", custom_tool_node)
-    graph.set_entry_point("agent")
+    # Entering at "tools" resumes a turn whose first model call already ran (speculation)
+    graph.set_entry_point(entry)
     graph.add_conditional_edges(
         "agent",
         should_continue,
@@ -303,54 +575,254 @@ def build_graph():
             "end": END,
         }
     )
-    graph.add_edge("tools", "agent")
+    if end_after_tools:
+        graph.add_conditional_edges(
+            "tools",
+            after_tools,
+            {
+                "agent": "agent",
+                "end": END,
+            }
+        )
+    else:
+        graph.add_edge("tools", "agent")
     return graph.compile()
 
-# Create the compiled graph
-app = build_graph()
-
-async def process_transcript_streaming(websocket: WebSocket, session_id: str, transcript: str, session_memory: Dict[str, Dict[str, Any]]) -> None:
-    """Process transcript and send streaming response."""
+# Compiled graphs by entry node, built once on first use (or by the startup warm-up)
+_apps: Dict[str, Any] = {}
+
+def get_graph(entry: str = "agent"):
+    if entry not in _apps:
+        _apps[entry] = build_graph(entry=entry)
+    return _apps[entry]
+
+def speculation_key(session: Dict[str, Any]) -> Tuple[Any, int]:
+    """Identifies the data and history a speculative model call was computed against."""
+    return data_version(session), session["conversation"].version
+
+async def speculate(session_id: str, transcript: str, session_memory: Dict[str, Dict[str, Any]]) -> Optional[Tuple[Tuple[Any, int], AIMessage]]:
+    """Run a turn's first model call for a transcript that is not final yet.
+
+    Nothing is sent to the client, no tools run and the conversation is left
+    untouched; the caller commits the returned message through
+    ``process_transcript_streaming(speculation=...)`` if the final transcript
+    matches, or cancels this. Returns None if the model call failed.
+    """
+    session = session_memory[session_id]
+    key = speculation_key(session)
+    state = {
+        "session_id": session_id,
+        "transcript": transcript,
+        "response": "",
+        "messages": [*session["conversation"].messages, HumanMessage(content=transcript)],
+        "session_memory": session_memory,
+        "tools_final": False,
+        "failed": False
+    }
+    state = await call_model(state)
+    if state["failed"]:
+        return None
+    return key, state["messages"][-1]
+
+# Split streamed text after sentence-ending punctuation so TTS can start early
+SENTENCE_BOUNDARY = re.compile(r"(?<=[.!?])\s+")
+
+class SentenceBuffer:
+    """Accumulate streamed tokens and release them one complete sentence at a time."""
+
+    def __init__(self):
+        self._text = ""
+
+    def feed(self, token: str) -> List[str]:
+        self._text += token
+        # Keep the trailing whitespace so the client can concatenate chunks as-is
+        sentences = []
+        consumed = 0
+        for match in SENTENCE_BOUNDARY.finditer(self._text):
+            sentences.append(self._text[consumed:match.end()])
+            consumed = match.end()
+        self._text = self._text[consumed:]
+        return sentences
+
+    def flush(self) -> str:
+        text, self._text = self._text, ""
+        return text
+
+async def process_transcript_streaming(
+    websocket: WebSocket,
+    session_id: str,
+    transcript: str,
+    session_memory: Dict[str, Dict[str, Any]],
+    speculation: Optional[Tuple[Tuple[Any, int], AIMessage]] = None,
+) -> bool:
+    """Process transcript and stream the response sentence by sentence.
+
+    ``speculation`` is the result of ``speculate`` for this transcript; it
+    replaces the first model call if the session has not changed since.
+    Returns whether it was used.
+    """
     # Skip empty or very short transcripts
     if not transcript or len(transcript.strip()) <= 3:
         if websocket.client_state == WebSocketState.CONNECTED:
-            await websocket.send_text(json.dumps({"type": "end", "text": ""}))
-        return
+            await send_end(websocket)
+        return False
+
+    async def send_chunk(text: str) -> None:
+        nonlocal first_chunk_at
+        if not text or websocket.client_state != WebSocketState.CONNECTED:
+            return
+        if first_chunk_at is None:
+            first_chunk_at = time.perf_counter()
+        await send_frame(websocket, {"type": "chunk", "text": text})
+
+    started_at = time.perf_counter()
+    first_chunk_at = None
+    used_speculation = False
 
     try:
         # Get conversation history
-        conversation_history = session_memory.get(session_id, {}).get("conversation", [])
+        memory = session_memory[session_id]["conversation"]
+        messages = memory.messages  # a fresh list the graph can extend in place
+        history_length = len(messages)
+        messages.append(HumanMessage(content=transcript))
 
         # Create initial state
         state = {
             "session_id": session_id,
             "transcript": transcript,
             "response": "",
-            "messages": conversation_history.copy(),
-            "session_memory": session_memory
+            "messages": messages,
+            "session_memory": session_memory,
+            "tools_final": False,
+            "failed": False
         }
 
         # Send start message
         if websocket.client_state == WebSocketState.CONNECTED:
-            await websocket.send_text(json.dumps({"type": "start", "text": "", "transcript": transcript}))
+            await send_frame(websocket, {"type": "start", "text": "", "transcript": transcript})
 
-        # Process the state through the graph
-        result = await app.ainvoke(state)
-        print(f"Graph result: {result}")
+        # Bind state to this turn's context before the graph spawns node tasks
+        AgentStateRegistry.set_state(state)
+
+        # Answer simple read-only commands, or repeats of a cached answer, without calling the model
+        session = session_memory[session_id]
+        cache = session_cache(session)
+        routed_tool = intent_router.match(transcript)
+        if routed_tool is not None:
+            result = await tools_by_name[routed_tool].ainvoke({})
+            direct_response = describe_tool_result(routed_tool, {}, result) or ""
+            outcome = "routed"
+        else:
+            direct_response = cache.get(session, transcript)
+            outcome = "cached"
+
+        if direct_response is not None:
+            await send_chunk(direct_response)
+            if websocket.client_state == WebSocketState.CONNECTED:
+                await send_end(websocket)
+            if routed_tool is not None:
+                intent_router.record_latency(time.perf_counter() - started_at)
+            metrics.turn_seconds.observe(time.perf_counter() - started_at)
+            if first_chunk_at is not None:
+                metrics.first_chunk_seconds.observe(first_chunk_at - started_at)
+            metrics.turns_total.inc(outcome)
+            metrics.logger.debug("Answered %r without the model (%s)", transcript, outcome)
+            memory.extend([HumanMessage(content=transcript), AIMessage(content=direct_response)])
+            return False
+
+        metrics.graph_stats["turns"] += 1
+        entry = "agent"
+        result = None
+        # Whether the turn's final answer came from a streamed model run (and so was already spoken)
+        answer_spoken = False
+
+        # A speculative first model call stands in for the real one if nothing changed meanwhile
+        if speculation is not None and speculation[0] == speculation_key(session):
+            used_speculation = True
+            response = speculation[1]
+            state["messages"].append(response)
+            state["response"] = response.content if isinstance(response.content, str) else ""
+            if response.tool_calls:
+                entry = "tools"
+            else:
+                buffer = SentenceBuffer()
+                for sentence in buffer.feed(state["response"]):
+                    await send_chunk(sentence)
+                await send_chunk(buffer.flush())
+                answer_spoken = True
+                result = state
+
+        # Stream model tokens as they arrive; model runs that turn into tool calls are not spoken
+        buffers: Dict[str, SentenceBuffer] = {}
+        tool_runs = set()
+
+        if result is None:
+            async for event in get_graph(entry).astream_events(state, version="v2"):
+                kind = event["event"]
+                run_id = event["run_id"]
+
+                if kind == "on_chat_model_stream":
+                    chunk = event["data"]["chunk"]
+                    if getattr(chunk, "tool_call_chunks", None):
+                        tool_runs.add(run_id)
+                        buffers.pop(run_id, None)
+                    if run_id in tool_runs or not isinstance(chunk.content, str) or not chunk.content:
+                        continue
+                    for sentence in buffers.setdefault(run_id, SentenceBuffer()).feed(chunk.content):
+                        await send_chunk(sentence)
+
+                elif kind == "on_chat_model_end":
+                    buffer = buffers.pop(run_id, None)
+                    if run_id in tool_runs or getattr(event["data"].get("output"), "tool_calls", None):
+                        # Anything said before the tool call was a preamble; the tools produce the answer
+                        answer_spoken = False
+                    else:
+                        if buffer:
+                            await send_chunk(buffer.flush())
+                        answer_spoken = True
+
+                elif kind == "on_chain_end" and not event.get("parent_ids"):
+                    result = event["data"]["output"]
 
-        # Send response if available
-        if result.get("response") and websocket.client_state == WebSocketState.CONNECTED:
-            await websocket.send_text(json.dumps({"type": "chunk", "text": result["response"]}))
+        if result is None:
+            raise RuntimeError("Graph finished without a result")
+        metrics.log_sampled(logging.DEBUG, lambda: f"Graph result: {result}")
+
+        # Speak the final response unless a streamed model run already did (tool-final or error turns)
+        if not answer_spoken and result.get("response"):
+            await send_chunk(result["response"])
 
         # Send end message
         if websocket.client_state == WebSocketState.CONNECTED:
-            await websocket.send_text(json.dumps({"type": "end", "text": ""}))
-
-        # Update session memory (limit conversation history to last 10 messages)
-        filtered_messages = [m for m in result["messages"] if not isinstance(m, SystemMessage)]
-        session_memory[session_id]["conversation"] = filtered_messages[-10:]
+            await send_end(websocket)
+
+        total = time.perf_counter() - started_at
+        ttfc = (first_chunk_at - started_at) if first_chunk_at is not None else None
+        metrics.turn_seconds.observe(total)
+        if ttfc is not None:
+            metrics.first_chunk_seconds.observe(ttfc)
+        metrics.turns_total.inc("completed")
+        metrics.log_sampled(logging.INFO, lambda: (
+            f"Turn latency: first chunk {f'{ttfc * 1000:.0f}ms' if ttfc is not None else 'n/a'}, total {total * 1000:.0f}ms"
+        ))
+
+        # Cache answers drawn only from the read tools; anything else may depend on the
+        # conversation so far ("what did I just add?") and must not be replayed later
+        turn_messages = result["messages"][history_length:]
+        tools_used = {m.name for m in turn_messages if isinstance(m, ToolMessage)}
+        if result.get("response") and not result.get("failed") and tools_used and tools_used <= READ_TOOLS:
+            cache.put(session, transcript, result["response"])
+
+        # Record the turn; memory trims old turns to its token budget on turn boundaries
+        if turn_messages and isinstance(turn_messages[-1], ToolMessage):
+            # The turn ended after tools; record what was said so the history reads naturally
+            turn_messages.append(AIMessage(content=result.get("response", "")))
+        memory.extend(turn_messages)
 
     except Exception as e:
         print(f"Error in process_transcript_streaming: {e}")
+        metrics.turns_total.inc("error")
         if websocket.client_state == WebSocketState.CONNECTED:
-            await websocket.send_text(json.dumps({"type": "error", "text": f"Error: {str(e)}. Please try again."}))
\ No newline at end of file
+            await send_frame(websocket, {"type": "error", "text": f"Error: {str(e)}. Please try again."})
+
+    return used_speculation
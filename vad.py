@@ -0,0 +1,111 @@
+from collections import deque
+from typing import Any, Dict, List
+import numpy as np
+import config
+
+BYTES_PER_SAMPLE = 2  # 16-bit PCM
+
+class VoiceActivityGate:
+    """Energy/zero-crossing voice activity gate for 16-bit mono PCM.
+
+    Each pushed buffer is viewed in place with ``np.frombuffer`` and split into
+    ``frame_ms`` frames, classified in one vectorized pass. Speech frames are
+    forwarded, followed by ``hangover_ms`` of trailing audio so the transcriber
+    still sees the pause it uses for endpointing; the ``preroll_ms`` before
+    speech onset is held back and forwarded with it so word starts are not
+    clipped. Other silence is dropped, except every ``keep_every``-th frame,
+    which keeps the upstream stream alive.
+    """
+
+    def __init__(
+        self,
+        sample_rate: int = 16000,
+        frame_ms: int = config.vad_frame_ms,
+        energy_threshold_db: float = config.vad_energy_threshold_db,
+        zcr_max: float = config.vad_zcr_max,
+        hangover_ms: int = config.vad_hangover_ms,
+        preroll_ms: int = config.vad_preroll_ms,
+        keep_every: int = config.vad_keep_every,
+    ):
+        self.frame_ms = frame_ms
+        self.frame_samples = sample_rate * frame_ms // 1000
+        self.frame_bytes = self.frame_samples * BYTES_PER_SAMPLE
+        self.energy_threshold_db = energy_threshold_db
+        self.zcr_max = zcr_max
+        self.hangover_frames = hangover_ms // frame_ms
+        self.keep_every = keep_every
+        self._preroll: deque = deque(maxlen=max(preroll_ms // frame_ms, 0))
+        self._remainder = b""
+        self._hangover = 0
+        self._silent_run = 0
+
+        # Metrics, in frames
+        self.speech_frames = 0
+        self.silence_frames = 0
+        self.forwarded_frames = 0
+
+    def classify(self, samples: np.ndarray) -> np.ndarray:
+        """Speech/non-speech decision for each row of a (frames, frame_samples) int16 array."""
+        x = samples.astype(np.float32)
+        rms = np.sqrt(np.mean(x * x, axis=1))
+        energy_db = 20.0 * np.log10(rms / 32768.0 + 1e-10)
+        signs = np.signbit(samples)
+        zcr = np.count_nonzero(signs[:, 1:] != signs[:, :-1], axis=1) / (self.frame_samples - 1)
+        # Broadband noise crosses zero far more often than voiced speech; it must be
+        # clearly louder than the threshold to count
+        loud = energy_db > self.energy_threshold_db
+        return loud & ((zcr <= self.zcr_max) | (energy_db > self.energy_threshold_db + 12.0))
+
+    def process(self, data: bytes) -> bytes:
+        """Return the part of ``data`` (plus any released pre-roll) to forward upstream."""
+        if self._remainder:
+            data = self._remainder + data
+        usable = len(data) - len(data) % self.frame_bytes
+        self._remainder = bytes(data[usable:])
+        if not usable:
+            return b""
+
+        view = memoryview(data)[:usable]
+        samples = np.frombuffer(view, dtype=np.int16).reshape(-1, self.frame_samples)
+        decisions = self.classify(samples)
+
+        out: List[memoryview] = []
+        fb = self.frame_bytes
+        for i, is_speech in enumerate(decisions.tolist()):
+            frame = view[i * fb:(i + 1) * fb]
+            if is_speech:
+                self.speech_frames += 1
+                out.extend(self._preroll)
+                self._preroll.clear()
+                out.append(frame)
+                self._hangover = self.hangover_frames
+                self._silent_run = 0
+                continue
+            self.silence_frames += 1
+            if self._hangover > 0:
+                self._hangover -= 1
+                out.append(frame)
+                continue
+            self._silent_run += 1
+            if self.keep_every and self._silent_run % self.keep_every == 0:
+                # Held-back frames predate this one; forwarding them later would reorder the audio
+                self._preroll.clear()
+                out.append(frame)
+            else:
+                self._preroll.append(frame)
+        self.forwarded_frames += len(out)
+        return b"".join(out)
+
+    @property
+    def in_speech(self) -> bool:
+        """Whether speech was heard within the last ``hangover_ms``."""
+        return self._hangover > 0
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.speech_frames + self.silence_frames
+        return {
+            "speech_ms": self.speech_frames * self.frame_ms,
+            "silence_ms": self.silence_frames * self.frame_ms,
+            "speech_ratio": self.speech_frames / total if total else 0.0,
+            "forwarded_ratio": self.forwarded_frames / total if total else 0.0,
+        }
@@ -0,0 +1,76 @@
+import asyncio
+import importlib
+import time
+from typing import Dict, Optional
+
+# Seconds spent in each startup step, reported by /ready
+startup_timings: Dict[str, float] = {}
+# Why a required step failed, if one did; the process then never becomes ready
+startup_error: Optional[str] = None
+_ready = asyncio.Event()
+_finished = asyncio.Event()
+
+def is_ready() -> bool:
+    return _ready.is_set()
+
+async def wait_until_ready() -> bool:
+    """Wait for warm-up to finish; False if it failed."""
+    await _finished.wait()
+    return _ready.is_set()
+
+async def _timed(name: str, step, required: bool = False) -> None:
+    started = time.perf_counter()
+    try:
+        await step()
+    except Exception as e:
+        if required:
+            raise
+        # Connection pre-warming is best effort; the first real request will retry
+        print(f"Warm-up step {name} failed: {e}")
+    finally:
+        startup_timings[name] = time.perf_counter() - started
+
+async def warm_up() -> None:
+    """Import the agent stack, compile the graph and open upstream connections."""
+    started = time.perf_counter()
+
+    async def import_agent():
+        # LangChain/LangGraph/OpenAI imports are the bulk of cold start; keep the loop free meanwhile
+        await asyncio.to_thread(importlib.import_module, "transcript_processor")
+
+    async def compile_graph():
+        import transcript_processor
+        transcript_processor.get_graph()
+
+    async def load_tokenizer():
+        import conversation_memory
+        await asyncio.to_thread(conversation_memory.load_encoding)
+
+    async def open_backend():
+        from backend_client import backend_client
+        await backend_client.client.head("/")
+
+    async def open_openai():
+        import transcript_processor
+        # Any cheap authenticated call opens the pooled TLS connection the model will reuse
+        await transcript_processor.model.bound.root_async_client.models.list()
+
+    global startup_error
+    try:
+        await _timed("import_agent", import_agent, required=True)
+        await _timed("compile_graph", compile_graph, required=True)
+    except Exception as e:
+        startup_error = f"{type(e).__name__}: {e}"
+        print(f"Warm-up failed, not accepting sessions: {startup_error}")
+        _finished.set()
+        return
+    await asyncio.gather(
+        _timed("load_tokenizer", load_tokenizer),
+        _timed("open_backend", open_backend),
+        _timed("open_openai", open_openai),
+    )
+
+    startup_timings["warm_up_total"] = time.perf_counter() - started
+    _ready.set()
+    _finished.set()
+    print(f"Warm-up complete in {startup_timings['warm_up_total'] * 1000:.0f}ms")
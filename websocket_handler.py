@@ -1,20 +1,60 @@
 import asyncio
-import json
+import time
 import uuid
 from datetime import datetime
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional
 from fastapi import WebSocket, WebSocketDisconnect
+from fastapi.responses import JSONResponse
 from fastapi.websockets import WebSocketState
 import assemblyai as aai
-from transcript_processor import process_transcript_streaming
+from task_store import TaskStore
+from audio_pipeline import AudioPipeline
+from vad import VoiceActivityGate
+from config import turn_policy, vad_enabled, speculation_enabled, speculation_stable_ms
+from intent_router import normalize
+from session_store import session_store, save_session, restore_conversation, worker_id
+from write_behind import write_behind_queue
+import data_sync
+from serialization import loads, negotiate, send_frame
+from session_manager import session_manager, estimate_session_memory
+import metrics
+import warmup
 
 # Global session memory
 session_memory: Dict[str, Dict[str, Any]] = {}
 
+# Per-session audio pipelines feeding the transcribers
+audio_pipelines: Dict[str, AudioPipeline] = {}
+
+# Per-session voice activity gates in front of the pipelines
+vad_gates: Dict[str, VoiceActivityGate] = {}
+
+async def reject_connection(websocket: WebSocket):
+    """Refuse a WebSocket before accepting it; clients are told to retry later."""
+    try:
+        await websocket.send_denial_response(JSONResponse(
+            {"error": "Server is at capacity, please retry shortly"}, status_code=503, headers={"Retry-After": "5"}
+        ))
+    except RuntimeError:
+        # The server doesn't support denial responses; a plain close is still cheap
+        await websocket.close(code=1013, reason="Server at capacity")
+
 async def websocket_endpoint(websocket: WebSocket):
     """Handle WebSocket connections for real-time transcription and processing."""
+    # Refuse before accepting when this worker is full, so no per-session work is done
+    if not session_manager.try_admit():
+        metrics.logger.debug("Session rejected: worker at capacity")
+        await reject_connection(websocket)
+        return
+
     session_id = None
     transcriber = None
+    audio_pipeline = None
+    vad_gate = None
+    current_turn = None
+    # Speculative first model call on a stable partial transcript, and the timer waiting for stability
+    speculation: Optional[Dict[str, Any]] = None
+    stability_timer: Optional[asyncio.Task] = None
     
     try:
         await websocket.accept()
@@ -22,73 +62,269 @@ async def websocket_endpoint(websocket: WebSocket):
         
         # Receive initial data from client
         try:
-            preProcessData = await websocket.receive_json()
+            text = await websocket.receive_text()
+            if not session_manager.payload_allowed(len(text)):
+                await websocket.close(code=1009, reason="Initial data too large")
+                return
+            preProcessData = loads(text)
             auth_token = preProcessData.get('authToken')
-            projects = preProcessData.get('projects', [])
-            tasks = preProcessData.get('tasks', [])
+            # Every frame we send from here on uses the format the client asked for
+            websocket.state.frame_codec = negotiate(preProcessData.get('frameFormat'))
+            resume_id = preProcessData.get('sessionId')
+            user = data_sync.user_key(auth_token)
+
+            # Clients may send just a dataVersion; the full arrays are only needed on a cache miss
+            data_version, doc = data_sync.resolve_handshake(user, preProcessData)
+            if doc is None:
+                await send_frame(websocket, {"type": "sync", "status": "snapshot_required", "text": "", "version": data_version})
+                # Audio may already be streaming; there is no transcriber yet, so skip it
+                message = await websocket.receive()
+                while message.get("text") is None:
+                    if message["type"] == "websocket.disconnect":
+                        raise WebSocketDisconnect()
+                    message = await websocket.receive()
+                if not session_manager.payload_allowed(len(message["text"])):
+                    await websocket.close(code=1009, reason="Initial data too large")
+                    return
+                snapshot = loads(message["text"])
+                data_version, doc = data_sync.resolve_handshake(user, {**snapshot, "dataVersion": snapshot.get("version")})
+            projects = list(doc["projects"])
+            tasks = doc["tasks"]
             
-            print(f"Received data - Tasks: {len(tasks)}, Projects: {len(projects)}, AuthToken: {'***' if auth_token else 'None'}")
+            print(f"Received data - Tasks: {len(tasks)}, Projects: {len(projects)}, Version: {data_version}, AuthToken: {'***' if auth_token else 'None'}")
             
         except Exception as e:
             print(f"Error receiving initial data: {e}")
             await websocket.close(code=1002, reason="Invalid initial data")
             return
         
-        # Create session
-        session_id = str(uuid.uuid4())
-        session_memory[session_id] = {
-            "auth_token": auth_token,
-            "projects": projects,
-            "tasks": tasks,
-            "conversation": []
-        }
-        
-        print(f"Session created with ID: {session_id}")
+        # Sessions only start once the agent stack is warm
+        if not warmup.is_ready() and not await warmup.wait_until_ready():
+            await websocket.close(code=1011, reason="Server failed to start")
+            return
+
+        # Resume a previous session (possibly served by another worker) or create a new one;
+        # langchain_core is loaded by the warm-up by now, keeping it out of the import path at startup
+        from conversation_memory import ConversationMemory
+        snapshot = await asyncio.to_thread(session_store.load, resume_id) if resume_id else None
+        if snapshot is not None and snapshot.get("owner") == user and resume_id not in session_memory:
+            # Only the conversation carries over; the client's data from this handshake is current
+            session_id = resume_id
+            session_memory[session_id] = {
+                "auth_token": auth_token,
+                "projects": projects,
+                "tasks": TaskStore(tasks),
+                "conversation": restore_conversation(snapshot),
+                "sync_doc": doc,
+                "sync_version": data_version
+            }
+            print(f"Session resumed with ID: {session_id}")
+        else:
+            session_id = str(uuid.uuid4())
+            session_memory[session_id] = {
+                "auth_token": auth_token,
+                "projects": projects,
+                "tasks": TaskStore(tasks),
+                "conversation": ConversationMemory(),
+                "sync_doc": doc,
+                "sync_version": data_version
+            }
+            print(f"Session created with ID: {session_id}")
+
+        await asyncio.to_thread(session_store.register, session_id, {"worker": worker_id, "started_at": time.time()})
+        await send_frame(websocket, {"type": "session", "text": "", "session_id": session_id, "version": data_version})
+
+        if write_behind_queue is not None:
+            async def send_correction(frame: Dict[str, Any]):
+                # Background writes that finally fail are undone locally and announced here
+                if websocket.client_state == WebSocketState.CONNECTED:
+                    await send_frame(websocket, frame)
+            write_behind_queue.register_session(session_id, session_memory[session_id], send_correction)
+
+        async def evict():
+            # Closing the socket ends the receive loop; the cleanup below closes the transcriber
+            if websocket.client_state == WebSocketState.CONNECTED:
+                await send_frame(websocket, {"type": "evicted", "text": "Session closed after inactivity"})
+                await websocket.close(code=1001, reason="Idle timeout")
+        session_manager.register(session_id, evict)
+
+        async def handle_sync(text: str):
+            """Apply a JSON-patch delta or full snapshot of the client's projects/tasks."""
+            if not session_manager.payload_allowed(len(text)):
+                await send_frame(websocket, {"type": "sync", "status": "error", "text": "Sync frame too large"})
+                return
+            try:
+                frame = loads(text)
+                if frame.get("type") not in ("patch", "snapshot"):
+                    metrics.logger.debug("Ignoring text frame of type %s", frame.get("type"))
+                    return
+                version = data_sync.apply_message(user, session_memory[session_id], frame)
+                reply = {"type": "sync", "status": "ok", "text": "", "version": version}
+            except data_sync.SyncConflict as e:
+                print(f"Sync conflict for session {session_id}: {e}")
+                reply = {"type": "sync", "status": "snapshot_required", "text": "", "version": session_memory[session_id]["sync_version"]}
+            except (ValueError, KeyError, TypeError) as e:
+                print(f"Invalid sync frame: {e}")
+                reply = {"type": "sync", "status": "error", "text": str(e)}
+            await send_frame(websocket, reply)
 
         # Setup transcription handling
         loop = asyncio.get_running_loop()
         last_transcript = None
-        is_processing = False
+        last_partial: Optional[str] = None
+        current_turn: Optional[asyncio.Task] = None
+        pending_transcripts: List[str] = []
         processing_lock = asyncio.Lock()
 
+        def discard_speculation(outcome: str):
+            nonlocal speculation
+            if speculation is not None:
+                speculation["task"].cancel()
+                metrics.speculations_total.inc(outcome)
+                speculation = None
+
+        async def speculate_when_stable(normalized: str, text: str):
+            """Start the first model call once a partial has stopped changing."""
+            nonlocal speculation
+            await asyncio.sleep(speculation_stable_ms / 1000)
+            if current_turn is not None and not current_turn.done():
+                return  # the in-flight turn is about to change the history
+            from transcript_processor import speculate
+            metrics.speculations_total.inc("started")
+            entry = {"text": normalized, "started_at": time.monotonic(), "done_at": None}
+            entry["task"] = asyncio.create_task(speculate(session_id, text, session_memory))
+            entry["task"].add_done_callback(lambda _: entry.__setitem__("done_at", time.monotonic()))
+            speculation = entry
+
+        def on_partial(text: str):
+            nonlocal last_partial, stability_timer
+            normalized = normalize(text)
+            if normalized == last_partial:
+                return  # unchanged; the stability timer keeps running
+            last_partial = normalized
+            if stability_timer is not None:
+                stability_timer.cancel()
+                stability_timer = None
+            if speculation is not None and speculation["text"] != normalized:
+                discard_speculation("superseded")
+            if len(normalized) > 3 and speculation is None:
+                stability_timer = asyncio.create_task(speculate_when_stable(normalized, text))
+
+        def take_speculation(text: str) -> Optional[Dict[str, Any]]:
+            """Hand over the speculation if it was computed for this final transcript."""
+            nonlocal speculation, last_partial, stability_timer
+            last_partial = None
+            if stability_timer is not None:
+                stability_timer.cancel()
+                stability_timer = None
+            if speculation is None or speculation["text"] != normalize(text):
+                discard_speculation("miss")
+                return None
+            taken, speculation = speculation, None
+            return taken
+
+        async def run_turn(text: str, received_at: float, spec: Optional[Dict[str, Any]] = None):
+            """Run one turn; on cancellation tell the client the answer was abandoned."""
+            nonlocal current_turn
+            cancelled = False
+            metrics.turn_queue_seconds.observe(time.monotonic() - received_at)
+            try:
+                metrics.logger.debug("Processing transcript: %s", text)
+                from transcript_processor import process_transcript_streaming
+                result = None
+                if spec is not None:
+                    result = await spec["task"]
+                    if result is None:
+                        metrics.speculations_total.inc("failed")
+                used = await process_transcript_streaming(websocket, session_id, text, session_memory, speculation=result)
+                if result is not None:
+                    metrics.speculations_total.inc("hit" if used else "unused")
+                    if used:
+                        # Model time that had already elapsed when the final transcript arrived
+                        metrics.speculation_saved_seconds.observe(min(received_at, spec["done_at"] or received_at) - spec["started_at"])
+                # Persist after every turn so a reconnect to any worker can pick up the conversation
+                await save_session(session_id, session_memory[session_id])
+            except asyncio.CancelledError:
+                cancelled = True
+                metrics.turns_total.inc("cancelled")
+                metrics.logger.debug("Turn cancelled: %s", text)
+                if websocket.client_state == WebSocketState.CONNECTED:
+                    try:
+                        await send_frame(websocket, {"type": "cancelled", "text": "", "transcript": text})
+                    except Exception:
+                        pass
+                raise
+            except Exception as e:
+                print(f"Error processing transcript: {e}")
+                if websocket.client_state == WebSocketState.CONNECTED:
+                    try:
+                        await send_frame(websocket, {
+                            "type": "error", 
+                            "text": f"Processing error: {str(e)}"
+                        })
+                    except:
+                        pass
+            finally:
+                if spec is not None and not spec["task"].done():
+                    spec["task"].cancel()
+                # In queue mode, utterances that arrived meanwhile are merged into the next turn
+                if pending_transcripts and not cancelled:
+                    merged = " ".join(pending_transcripts)
+                    pending_transcripts.clear()
+                    current_turn = asyncio.create_task(run_turn(merged, time.monotonic()))
+
         async def on_data(transcript: aai.RealtimeTranscript):
             """Handle incoming transcript data."""
-            nonlocal last_transcript, is_processing
+            nonlocal last_transcript, current_turn
             
-            # Skip partial transcripts and empty text
-            if (not transcript.text or 
-                str(transcript.message_type) == "RealtimeMessageTypes.partial_transcript" or
-                len(transcript.text.strip()) <= 3):
+            # Partial transcripts only feed speculation
+            if str(transcript.message_type) == "RealtimeMessageTypes.partial_transcript":
+                if speculation_enabled:
+                    on_partial(transcript.text or "")
+                return
+            received_at = time.monotonic()
+
+            # Skip empty or very short text
+            if not transcript.text or len(transcript.text.strip()) <= 3:
+                metrics.transcripts_total.inc("dropped")
                 return
             
             # Avoid duplicate processing
             if transcript.text == last_transcript:
+                metrics.transcripts_total.inc("duplicate")
                 return
+
+            # Time from the end of the utterance's audio leaving us to the final transcript
+            audio_end = getattr(transcript, "audio_end", None)
+            if audio_pipeline is not None and audio_end:
+                sent_at = audio_pipeline.sent_at(audio_end)
+                if sent_at is not None:
+                    metrics.transcription_seconds.observe(received_at - sent_at)
                 
             async with processing_lock:
-                if is_processing:
-                    return
-                    
-                is_processing = True
                 last_transcript = transcript.text
+                spec = take_speculation(transcript.text) if speculation_enabled else None
 
-            try:
-                print(f"Processing transcript: {transcript.text}")
-                await process_transcript_streaming(websocket, session_id, transcript.text, session_memory)
-            except Exception as e:
-                print(f"Error processing transcript: {e}")
-                if websocket.client_state == WebSocketState.CONNECTED:
+                if current_turn is not None and not current_turn.done():
+                    if turn_policy == "queue":
+                        metrics.transcripts_total.inc("queued")
+                        pending_transcripts.append(transcript.text)
+                        if spec is not None:
+                            # Queued utterances are merged, so the speculated text won't be asked as-is
+                            spec["task"].cancel()
+                            metrics.speculations_total.inc("unused")
+                        return
+
+                    # Barge-in: the newer utterance replaces the in-flight turn
+                    metrics.transcripts_total.inc("interrupting")
+                    current_turn.cancel()
                     try:
-                        await websocket.send_text(json.dumps({
-                            "type": "error", 
-                            "text": f"Processing error: {str(e)}"
-                        }))
-                    except:
+                        await current_turn
+                    except BaseException:
                         pass
-            finally:
-                is_processing = False
-                # Small delay to prevent rapid-fire processing
-                await asyncio.sleep(0.1)
+
+                metrics.transcripts_total.inc("accepted")
+                current_turn = asyncio.create_task(run_turn(transcript.text, received_at, spec))
 
         def on_error(error):
             print(f"AssemblyAI error: {error}")
@@ -111,6 +347,12 @@ async def websocket_endpoint(websocket: WebSocket):
             
             transcriber.connect()
             print("Transcriber connected successfully")
+
+            # Stream audio from a dedicated thread so a slow transcriber never blocks the event loop
+            audio_pipeline = AudioPipeline(transcriber.stream, sample_rate=16000, name=f"audio-{session_id[:8]}")
+            audio_pipelines[session_id] = audio_pipeline
+            if vad_enabled:
+                vad_gate = vad_gates[session_id] = VoiceActivityGate(sample_rate=16000)
             
         except Exception as e:
             print(f"Error creating transcriber: {e}")
@@ -126,16 +368,33 @@ async def websocket_endpoint(websocket: WebSocket):
                         print("WebSocket disconnected, breaking loop")
                         break
                     
-                    # Receive audio data
-                    data = await websocket.receive_bytes()
-                    
+                    # Binary frames carry audio; text frames carry data sync messages
+                    message = await websocket.receive()
+                    if message["type"] == "websocket.disconnect":
+                        print("WebSocket disconnected by client")
+                        break
+
+                    if message.get("text") is not None:
+                        session_manager.touch(session_id)
+                        await handle_sync(message["text"])
+                        continue
+
+                    data = message.get("bytes")
                     if not data:
                         print("Received empty data, breaking loop")
                         break
                     
-                    # Stream data to transcriber
-                    if transcriber:
-                        transcriber.stream(data)
+                    # Drop silence before it costs a transcriber round trip
+                    if vad_gate is not None:
+                        data = vad_gate.process(data)
+
+                    # Open microphones stream silence forever; only speech keeps a session alive
+                    if vad_gate is None or vad_gate.in_speech:
+                        session_manager.touch(session_id)
+
+                    # Queue data for the transcriber
+                    if audio_pipeline and data:
+                        audio_pipeline.push(data)
                         
                 except WebSocketDisconnect:
                     print("WebSocket disconnected by client")
@@ -155,6 +414,24 @@ async def websocket_endpoint(websocket: WebSocket):
         # Cleanup resources
         print(f"Cleaning up session: {session_id}")
         
+        # Abandon any in-flight turn; its OpenAI/backend calls are cancelled with it
+        if current_turn is not None and not current_turn.done():
+            current_turn.cancel()
+        if stability_timer is not None:
+            stability_timer.cancel()
+        if speculation is not None:
+            speculation["task"].cancel()
+            metrics.speculations_total.inc("abandoned")
+
+        # Flush and stop the audio sender before closing the transcriber
+        if audio_pipeline:
+            try:
+                await asyncio.to_thread(audio_pipeline.close)
+            except Exception as e:
+                print(f"Error closing audio pipeline: {e}")
+            audio_pipelines.pop(session_id, None)
+        vad_gates.pop(session_id, None)
+
         # Close transcriber
         if transcriber:
             try:
@@ -163,8 +440,16 @@ async def websocket_endpoint(websocket: WebSocket):
             except Exception as e:
                 print(f"Error closing transcriber: {e}")
         
-        # Remove session from memory
+        if write_behind_queue is not None and session_id:
+            write_behind_queue.unregister_session(session_id)
+
+        # Remove session from memory, keeping a snapshot for resumption
         if session_id and session_id in session_memory:
+            try:
+                await save_session(session_id, session_memory[session_id])
+                await asyncio.to_thread(session_store.unregister, session_id)
+            except Exception as e:
+                print(f"Error saving session snapshot: {e}")
             del session_memory[session_id]
             print(f"Session memory cleared for: {session_id}")
         
@@ -175,13 +460,45 @@ async def websocket_endpoint(websocket: WebSocket):
                 print("WebSocket closed")
         except Exception as e:
             print(f"Error closing websocket: {e}")
-        
+
+        session_manager.release(session_id)
         print(f"Session cleanup completed for: {session_id}")
 
 # Health check function for debugging
 def get_active_sessions():
-    """Get information about active sessions."""
+    """Get information about active sessions (cheap enough for /health)."""
     return {
         "active_sessions": len(session_memory),
-        "session_ids": list(session_memory.keys())
-    }
\ No newline at end of file
+        "session_ids": list(session_memory.keys()),
+        "audio": {sid: pipeline.stats() for sid, pipeline in audio_pipelines.items()},
+        "vad": {sid: gate.stats() for sid, gate in vad_gates.items()},
+        "idle_seconds": {sid: round(session_manager.idle_seconds(sid), 1) for sid in session_memory},
+        "admission": {"admitted": session_manager.admitted, "max_sessions": session_manager.max_sessions},
+        "worker": worker_id
+    }
+
+async def get_session_details():
+    """Active sessions plus per-session memory estimates and cluster-wide counts, for /sessions.
+
+    Memory estimates serialize every session's data and the cluster view queries
+    the session store, so they are kept off the frequently polled /health.
+    """
+    return {
+        **get_active_sessions(),
+        "memory": {
+            sid: estimate_session_memory(
+                session,
+                audio_pipelines[sid].stats()["queue_depth_ms"] * audio_pipelines[sid].bytes_per_ms if sid in audio_pipelines else 0,
+            )
+            for sid, session in session_memory.items()
+        },
+        "cluster": await asyncio.to_thread(get_cluster_sessions)
+    }
+
+def get_cluster_sessions():
+    """Active session counts per worker, as seen through the shared session store."""
+    per_worker: Dict[str, int] = {}
+    for info in session_store.active_sessions():
+        worker = str(info.get("worker"))
+        per_worker[worker] = per_worker.get(worker, 0) + 1
+    return {"active_sessions": sum(per_worker.values()), "workers": per_worker}
\ No newline at end of file
@@ -0,0 +1,278 @@
+import asyncio
+import json
+import os
+import sqlite3
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+import httpx
+from backend_client import IDEMPOTENT_METHODS, backend_client
+import config
+import data_sync
+import metrics
+
+write_behind_total = metrics.registry.counter("jarvis_write_behind_total", "Write-behind operations, by outcome", ("outcome",))
+
+Notifier = Callable[[Dict[str, Any]], Awaitable[None]]
+
+class _ClaimLost(Exception):
+    """Another worker took over a journaled write after this worker's claim lapsed."""
+
+class WriteBehindQueue:
+    """Durable per-session outbound queue for optimistic task writes.
+
+    Tools apply a change to the session's TaskStore and journal the backend
+    request here, then answer the user straight away. One worker task per
+    session replays the journal in order with retries; server-assigned ids
+    replace the optimistic ``local-`` ids, and a write that ultimately fails
+    is rolled back locally and reported to the client as a ``correction``.
+
+    Auth tokens never reach the journal: rows carry the hashed user key and are
+    sent with the token of a live session of that user, so writes left over
+    from a restart are delivered once their user reconnects.
+
+    Workers sharing a journal claim each row before sending it, and a session's
+    writes stop draining here while another worker holds its oldest row, so
+    every write is sent by one worker and in order.
+    """
+
+    def __init__(self, path: str = config.write_behind_journal, worker: Optional[int] = None):
+        self._worker = os.getpid() if worker is None else worker
+        self._conn = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS outbox ("
+            " seq INTEGER PRIMARY KEY AUTOINCREMENT, session_id TEXT NOT NULL, owner TEXT NOT NULL,"
+            " method TEXT NOT NULL, path TEXT NOT NULL, payload TEXT NOT NULL,"
+            " local_id TEXT, previous TEXT, created_at REAL NOT NULL,"
+            " claimed_by INTEGER, claimed_at REAL)"
+        )
+        # A previous process with this pid may have left rows claimed
+        self._release_claims()
+        # Optimistic local id -> server id; a NULL server id means the create failed
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS id_map ("
+            " local_id TEXT PRIMARY KEY, session_id TEXT NOT NULL, server_id TEXT)"
+        )
+        self._workers: Dict[str, asyncio.Task] = {}
+        self._sessions: Dict[str, Dict[str, Any]] = {}
+        self._notifiers: Dict[str, Notifier] = {}
+        # Hashed user key -> auth token of a live session; memory only
+        self._tokens: Dict[str, str] = {}
+
+    def register_session(self, session_id: str, session_data: Dict[str, Any], notify: Notifier) -> None:
+        self._sessions[session_id] = session_data
+        self._notifiers[session_id] = notify
+        self._tokens[data_sync.user_key(session_data["auth_token"])] = session_data["auth_token"]
+        # Writes journaled for this user before a restart can be delivered now
+        self.resume_pending()
+
+    def unregister_session(self, session_id: str) -> None:
+        # Pending writes still drain; there is just nobody left to tell about failures
+        self._sessions.pop(session_id, None)
+        self._notifiers.pop(session_id, None)
+        if not self.pending(session_id):
+            self._forget(session_id)
+
+    def _forget(self, session_id: str) -> None:
+        """Drop what is kept for a session that has left and whose writes have all drained."""
+        self._conn.execute("DELETE FROM id_map WHERE session_id = ?", (session_id,))
+        live = {data_sync.user_key(session["auth_token"]) for session in self._sessions.values()}
+        waiting = {owner for (owner,) in self._conn.execute("SELECT DISTINCT owner FROM outbox").fetchall()}
+        for owner in list(self._tokens):
+            if owner not in live and owner not in waiting:
+                del self._tokens[owner]
+
+    def _resolve(self, task_ref: str) -> Tuple[str, bool]:
+        """The server id for an optimistic local id once its create landed, and whether that create failed."""
+        if not task_ref.startswith("local-"):
+            return task_ref, False
+        row = self._conn.execute("SELECT server_id FROM id_map WHERE local_id = ?", (task_ref,)).fetchone()
+        if row is None:
+            return task_ref, False
+        return (row[0] or task_ref), row[0] is None
+
+    def pending(self, session_id: Optional[str] = None) -> int:
+        if session_id is None:
+            return self._conn.execute("SELECT COUNT(*) FROM outbox").fetchone()[0]
+        return self._conn.execute("SELECT COUNT(*) FROM outbox WHERE session_id = ?", (session_id,)).fetchone()[0]
+
+    def create_task(self, session_id: str, session_data: Dict[str, Any], payload: Dict[str, Any]) -> dict:
+        local_id = f"local-{uuid.uuid4().hex[:12]}"
+        session_data["tasks"].upsert({"id": local_id, **payload})
+        self._enqueue(session_id, session_data["auth_token"], "POST", "/todo/tasks/", payload, local_id=local_id)
+        return {"status": "success", "task_id": local_id, "pending": True}
+
+    def update_task(self, session_id: str, session_data: Dict[str, Any], id: str, payload: Dict[str, Any]) -> dict:
+        # The model may still refer to a task by the local id it was created under
+        id, failed = self._resolve(str(id))
+        if failed:
+            return {"error": "Task update failed: the task could not be created"}
+        tasks = session_data["tasks"]
+        previous = tasks.get(id)
+        tasks.upsert({**(previous or {}), "id": id, **payload}, key=id)
+        self._enqueue(session_id, session_data["auth_token"], "PUT", f"/todo/tasks/{id}", payload, previous=previous)
+        return {"status": "success", "pending": True}
+
+    def _enqueue(self, session_id, auth_token, method, path, payload, local_id=None, previous=None) -> None:
+        owner = data_sync.user_key(auth_token)
+        self._tokens[owner] = auth_token
+        self._conn.execute(
+            "INSERT INTO outbox (session_id, owner, method, path, payload, local_id, previous, created_at)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (session_id, owner, method, path, json.dumps(payload), local_id,
+             json.dumps(previous) if previous is not None else None, time.time()),
+        )
+        write_behind_total.inc("queued")
+        self._ensure_worker(session_id)
+
+    def _ensure_worker(self, session_id: str) -> None:
+        worker = self._workers.get(session_id)
+        if worker is None or worker.done():
+            self._workers[session_id] = asyncio.get_running_loop().create_task(self._drain(session_id))
+
+    def resume_pending(self) -> None:
+        """Restart draining for journaled writes whose user has a live session."""
+        for session_id, owner in self._conn.execute("SELECT DISTINCT session_id, owner FROM outbox").fetchall():
+            if owner in self._tokens:
+                self._ensure_worker(session_id)
+
+    async def stop(self) -> None:
+        """Cancel the workers; undelivered writes stay journaled for the next start."""
+        workers = [w for w in self._workers.values() if not w.done()]
+        for worker in workers:
+            worker.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+        self._workers.clear()
+        self._release_claims()
+
+    def _claim(self, seq: int) -> bool:
+        """Claim (or renew the claim on) a journaled write; False if another worker holds it."""
+        now = time.time()
+        cursor = self._conn.execute(
+            "UPDATE outbox SET claimed_by = ?, claimed_at = ? WHERE seq = ?"
+            " AND (claimed_by IS NULL OR claimed_by = ? OR claimed_at < ?)",
+            (self._worker, now, seq, self._worker, now - config.write_behind_claim_ttl),
+        )
+        return cursor.rowcount == 1
+
+    def _release_claims(self) -> None:
+        self._conn.execute("UPDATE outbox SET claimed_by = NULL, claimed_at = NULL WHERE claimed_by = ?", (self._worker,))
+
+    async def _drain(self, session_id: str) -> None:
+        try:
+            while True:
+                row = self._conn.execute(
+                    "SELECT seq, owner, method, path, payload, local_id, previous FROM outbox"
+                    " WHERE session_id = ? ORDER BY seq LIMIT 1",
+                    (session_id,),
+                ).fetchone()
+                if row is None:
+                    return
+                seq, owner, method, path, payload, local_id, previous = row
+                auth_token = self._tokens.get(owner)
+                if auth_token is None:
+                    # Journaled before a restart; picked up again when the user reconnects
+                    return
+                if not self._claim(seq):
+                    # Another worker is draining this session; later rows must wait behind it
+                    return
+                try:
+                    error = await self._send(seq, auth_token, method, path, json.loads(payload), local_id, session_id)
+                except _ClaimLost:
+                    return
+                self._conn.execute("DELETE FROM outbox WHERE seq = ?", (seq,))
+                if error is None:
+                    write_behind_total.inc("succeeded")
+                else:
+                    write_behind_total.inc("failed")
+                    await self._roll_back(session_id, method, path, json.loads(payload), local_id,
+                                          json.loads(previous) if previous else None, error)
+        finally:
+            if self._workers.get(session_id) is asyncio.current_task():
+                del self._workers[session_id]
+            if session_id not in self._sessions and not self.pending(session_id):
+                self._forget(session_id)
+
+    async def _send(self, seq, auth_token, method, path, payload, local_id, session_id) -> Optional[str]:
+        """Deliver one journaled write; returns an error message or None on success."""
+        # Writes against an optimistically created task must wait for (and use) its server id
+        task_ref = path.rsplit("/", 1)[-1]
+        server_ref, failed = self._resolve(task_ref)
+        if failed:
+            return "the task it refers to could not be created"
+        if server_ref != task_ref:
+            path = path[: -len(task_ref)] + server_ref
+
+        # This is the only retry loop (the client's own retries are off), and a write that may
+        # have reached the server is only sent again if repeating it is harmless: a POST whose
+        # response was lost may already have created the task
+        idempotent = method in IDEMPOTENT_METHODS
+        error = None
+        for attempt in range(config.write_behind_max_attempts):
+            if attempt:
+                await asyncio.sleep(config.backend_retry_backoff * (2 ** (attempt - 1)))
+                if not self._claim(seq):
+                    raise _ClaimLost()
+            try:
+                response = await backend_client.request(method, path, auth_token, payload, max_retries=0)
+            except (httpx.ConnectError, httpx.ConnectTimeout) as e:
+                error = f"Request failed: {str(e)}"
+                continue  # never reached the server
+            except httpx.RequestError as e:
+                error = f"Request failed: {str(e)}"
+                if not idempotent:
+                    break
+                continue
+            if response.status_code == 200:
+                self._reconcile(session_id, method, path, response.json(), local_id)
+                return None
+            error = f"HTTP {response.status_code}"
+            if response.status_code < 500 or not idempotent:
+                break  # client errors will not succeed on retry
+        return error
+
+    def _reconcile(self, session_id, method, path, server_task, local_id) -> None:
+        session_data = self._sessions.get(session_id)
+        if method == "POST" and local_id:
+            server_id = server_task.get("id")
+            if server_id is not None:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO id_map (local_id, session_id, server_id) VALUES (?, ?, ?)",
+                    (local_id, session_id, str(server_id)),
+                )
+            if session_data is not None:
+                session_data["tasks"].remove(local_id)
+                session_data["tasks"].upsert(server_task)
+        elif session_data is not None:
+            session_data["tasks"].upsert(server_task, key=path.rsplit("/", 1)[-1])
+
+    async def _roll_back(self, session_id, method, path, payload, local_id, previous, error) -> None:
+        session_data = self._sessions.get(session_id)
+        task_ref, _ = self._resolve(path.rsplit("/", 1)[-1])
+        if method == "POST" and local_id:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO id_map (local_id, session_id, server_id) VALUES (?, ?, NULL)",
+                (local_id, session_id),
+            )
+            if session_data is not None:
+                session_data["tasks"].remove(local_id)
+            text = f"Sorry, I couldn't save the task '{payload.get('content', 'Unknown')}' ({error}), so I've removed it."
+        else:
+            if session_data is not None:
+                if previous is not None:
+                    session_data["tasks"].upsert(previous, key=task_ref)
+                else:
+                    session_data["tasks"].remove(task_ref)
+            text = f"Sorry, my update to '{payload.get('content', 'that task')}' didn't save ({error}), so I've undone it."
+        print(f"Write-behind failed for session {session_id}: {method} {path}: {error}")
+
+        notify = self._notifiers.get(session_id)
+        if notify is not None:
+            try:
+                await notify({"type": "correction", "text": text, "task_id": local_id or task_ref})
+            except Exception as e:
+                print(f"Error sending correction: {e}")
+
+write_behind_queue: Optional[WriteBehindQueue] = WriteBehindQueue() if config.write_behind_enabled else None